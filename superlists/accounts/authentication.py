@@ -1,26 +1,82 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
 from django.contrib.auth import get_user_model
 
-from accounts.models import Token
+from accounts.tokens import use_login_token
 
 User = get_user_model()
 
+USER_CACHE_TTL = 60
+USER_CACHE_MAX_SIZE = 1000
+
+
+class UserCache(object):
+    """найденные пользователи в памяти процесса, не дольше ttl секунд и не больше max_size;
+    изменения пользователей сбрасывают их записи (accounts.receivers)"""
+
+    def __init__(self, ttl=USER_CACHE_TTL, max_size=USER_CACHE_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._users = OrderedDict()
+
+    def get(self, email):
+        """копия пользователя из кэша или None"""
+
+        with self._lock:
+            user, expires_at = self._users.get(email, (None, 0))
+            if expires_at <= time.monotonic():
+                self._users.pop(email, None)
+                return None
+            self._users.move_to_end(email)
+        # запросы обслуживаются в потоках, у каждого свой объект
+        return copy.copy(user)
+
+    def set(self, email, user):
+        with self._lock:
+            self._users[email] = (copy.copy(user), time.monotonic() + self.ttl)
+            self._users.move_to_end(email)
+            while len(self._users) > self.max_size:
+                self._users.popitem(last=False)
+
+    def invalidate(self, email):
+        with self._lock:
+            self._users.pop(email, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+user_cache = UserCache()
+
 
 class PasswordlessAuthenticationBackend(object):
     """беспарольный серверный процессор аутентификации"""
 
     def authenticate(self, uid):
-        """аутентифицировать"""
+        """аутентифицировать по действующему токену; токен при этом используется"""
 
+        email = use_login_token(uid)
+        if email is None:
+            return None
         try:
-            token = Token.objects.get(uid=uid)
-            return User.objects.get(email=token.email)
+            return User.objects.get(email=email)
         except User.DoesNotExist as e:
-            return User.objects.create(email=token.email)
-        except Token.DoesNotExist as e:
-            return None
+            return User.objects.create(email=email)
 
     def get_user(self, email):
+        """пользователь сессии; без запроса к БД, пока он есть в кэше"""
+
+        user = user_cache.get(email)
+        if user is not None:
+            return user
         try:
-            return User.objects.get(email=email)
+            user = User.objects.get(email=email)
         except User.DoesNotExist as e:
             return None
+        user_cache.set(email, user)
+        return user
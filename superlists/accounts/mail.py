@@ -0,0 +1,86 @@
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from accounts.models import OutgoingEmail
+
+SEND_BATCH_SIZE = 100
+MAX_ATTEMPTS = 8
+RETRY_BASE_DELAY = timedelta(minutes=1)
+RETRY_MAX_DELAY = timedelta(hours=1)
+
+
+def queue_mail(subject, message, from_email, recipient_list):
+    """поставить письмо в очередь; отправит его команда send_queued_mail"""
+
+    return OutgoingEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email,
+        recipients='\n'.join(recipient_list),
+    )
+
+
+def retry_delay(attempts):
+    """задержка перед следующей попыткой: удваивается с каждой неудачей"""
+
+    return min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+
+
+def send_queued_mail(batch_size=SEND_BATCH_SIZE):
+    """отправить пачку писем, которым подошел срок, через одно соединение с SMTP;
+    возвращает количество отправленных писем
+
+    Неудачное письмо откладывается с растущей задержкой, после MAX_ATTEMPTS
+    попыток остается в очереди с последней ошибкой и больше не отправляется.
+    Если не удается открыть соединение, так же откладываются все оставшиеся письма пачки.
+    Рассчитано на один процесс-отправитель."""
+
+    emails = list(
+        OutgoingEmail.objects.filter(next_attempt_at__lte=timezone.now(), attempts__lt=MAX_ATTEMPTS)
+        .order_by('next_attempt_at', 'id')[:batch_size]
+    )
+    if not emails:
+        return 0
+
+    sent = 0
+    connection = get_connection()
+    opened = False
+    try:
+        for index, email in enumerate(emails):
+            if not opened:
+                try:
+                    connection.open()
+                except Exception as e:
+                    # SMTP недоступен: оставшиеся письма пачки откладываются, не отправляясь
+                    for rest in emails[index:]:
+                        _defer(rest, e)
+                    break
+                opened = True
+            message = EmailMessage(
+                email.subject, email.body, email.from_email, email.recipients.split('\n'),
+                connection=connection,
+            )
+            try:
+                message.send()
+            except Exception as e:
+                _defer(email, e)
+                # соединение после ошибки может быть испорчено: следующее письмо откроет новое
+                connection.close()
+                opened = False
+            else:
+                email.delete()
+                sent += 1
+    finally:
+        connection.close()
+    return sent
+
+
+def _defer(email, error):
+    """засчитать неудачную попытку и отложить письмо"""
+
+    email.attempts += 1
+    email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+    email.last_error = repr(error)
+    email.save(update_fields=['attempts', 'next_attempt_at', 'last_error'])
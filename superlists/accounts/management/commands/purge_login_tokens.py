@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.models import Token, UsedLoginToken
+
+
+class Command(BaseCommand):
+    """удалить просроченные токены входа пачками"""
+
+    help = 'Удаляет токены входа и отметки использованных токенов с истекшим сроком действия'
+
+    def add_arguments(self, parser):
+        """добавить аргументы"""
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        """обработать"""
+        deleted = purge_login_tokens(timezone.now(), batch_size=options['batch_size'])
+        self.stdout.write(f'Удалено токенов: {deleted}')
+
+
+def purge_login_tokens(now, batch_size=1000):
+    """удалить токены и отметки, истекшие к моменту now, каждая пачка отдельным запросом"""
+
+    return sum(_purge_expired(model, now, batch_size) for model in (Token, UsedLoginToken))
+
+
+def _purge_expired(model, now, batch_size):
+    deleted = 0
+    while True:
+        ids = list(
+            model.objects.filter(expires_at__lte=now).order_by('expires_at').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += model.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.mail import SEND_BATCH_SIZE, send_queued_mail
+
+
+class Command(BaseCommand):
+    """отправить письма из очереди"""
+
+    help = 'Отправляет письма из очереди пачками через одно соединение; с --interval работает постоянно'
+
+    def add_arguments(self, parser):
+        """добавить аргументы"""
+        parser.add_argument('--batch-size', type=int, default=SEND_BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=0,
+                            help='пауза в секундах между проверками очереди; 0 - отправить и выйти')
+
+    def handle(self, *args, **options):
+        """обработать"""
+        while True:
+            sent = self.send_due(options['batch_size'])
+            if not options['interval']:
+                self.stdout.write(f'Отправлено писем: {sent}')
+                return
+            time.sleep(options['interval'])
+
+    def send_due(self, batch_size):
+        """отправлять пачки, пока они отправляются полностью"""
+        total = 0
+        while True:
+            sent = send_queued_mail(batch_size)
+            total += sent
+            if sent < batch_size:
+                return total
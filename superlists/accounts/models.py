@@ -1,7 +1,9 @@
 import uuid
+from datetime import timedelta
 
 from django.contrib import auth
 from django.db import models
+from django.utils import timezone
 
 auth.signals.user_logged_in.disconnect(auth.models.update_last_login)
 
@@ -16,8 +18,41 @@ class User(models.Model):
     is_authenticated = True
 
 
+TOKEN_LIFETIME = timedelta(hours=1)
+
+
+def token_expires_at():
+    """срок действия нового токена"""
+
+    return timezone.now() + TOKEN_LIFETIME
+
+
 class Token(models.Model):
-    """Модель токена для каждого пользователя"""
+    """Модель одноразового токена для входа по ссылке"""
 
     email = models.EmailField()
-    uid = models.CharField(max_length=255, default=uuid.uuid4)
+    uid = models.CharField(max_length=255, default=uuid.uuid4, unique=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(default=token_expires_at, db_index=True)
+
+
+class UsedLoginToken(models.Model):
+    """отметка об использованном подписанном токене входа, хранится до его истечения"""
+
+    # sha256 токена: уникальность не дает войти по одной ссылке дважды даже параллельно
+    digest = models.CharField(max_length=64, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+
+class OutgoingEmail(models.Model):
+    """письмо в очереди на отправку; отправленные письма удаляются"""
+
+    subject = models.TextField()
+    body = models.TextField()
+    from_email = models.TextField()
+    # адреса через перевод строки
+    recipients = models.TextField()
+    created_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now, db_index=True)
+    last_error = models.TextField(blank=True, default='')
@@ -1,8 +1,14 @@
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
-from accounts.authentication import PasswordlessAuthenticationBackend
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from accounts.authentication import USER_CACHE_TTL, PasswordlessAuthenticationBackend, UserCache, user_cache
 
-from accounts.models import Token
+from accounts.models import Token, UsedLoginToken
+from accounts.tokens import make_login_token
 
 User = get_user_model()
 
@@ -37,9 +43,86 @@ class AuthenticateTest(TestCase):
         self.assertEqual(user, existing_user)
 
 
+    def test_token_is_single_use(self):
+        """тест: по одному токену можно войти только один раз"""
+
+        token = Token.objects.create(email="user@mail.com")
+        backend = PasswordlessAuthenticationBackend()
+
+        self.assertIsNotNone(backend.authenticate(token.uid))
+        self.assertIsNone(backend.authenticate(token.uid))
+        self.assertFalse(Token.objects.exists())
+
+    def test_returns_None_if_token_expired(self):
+        """тест: с просроченным токеном войти нельзя"""
+
+        token = Token.objects.create(email="user@mail.com", expires_at=timezone.now() - timedelta(seconds=1))
+        result = PasswordlessAuthenticationBackend().authenticate(token.uid)
+        self.assertIsNone(result)
+
+
+@override_settings(LOGIN_TOKEN_MODE='signed')
+class SignedTokenAuthenticateTest(TestCase):
+    """тест входа по подписанным токенам"""
+
+    def test_signed_token_logs_in_without_db_token(self):
+        """тест: подписанный токен выдается и проверяется без таблицы токенов"""
+
+        with self.assertNumQueries(0):
+            token = make_login_token('user@mail.com')
+        user = PasswordlessAuthenticationBackend().authenticate(token)
+
+        self.assertEqual(user.email, 'user@mail.com')
+        self.assertFalse(Token.objects.exists())
+
+    def test_tampered_token_is_rejected(self):
+        """тест: токен с измененным адресом не принимается"""
+
+        token = make_login_token('user@mail.com')
+        tampered = token.replace(token.split(':')[0], make_login_token('evil@mail.com').split(':')[0])
+        self.assertIsNone(PasswordlessAuthenticationBackend().authenticate(tampered))
+        self.assertIsNone(PasswordlessAuthenticationBackend().authenticate(None))
+
+    def test_expired_token_is_rejected(self):
+        """тест: просроченный токен не принимается"""
+
+        with patch('django.core.signing.time.time', return_value=time.time() - 2 * 60 * 60):
+            token = make_login_token('user@mail.com')
+        self.assertIsNone(PasswordlessAuthenticationBackend().authenticate(token))
+
+    def test_token_is_single_use(self):
+        """тест: повторный вход по той же ссылке не проходит"""
+
+        token = make_login_token('user@mail.com')
+        backend = PasswordlessAuthenticationBackend()
+        self.assertIsNotNone(backend.authenticate(token))
+        self.assertIsNone(backend.authenticate(token))
+
+    def test_used_token_marker_expires_with_token(self):
+        """тест: отметка об использовании хранится в БД до истечения токена"""
+
+        PasswordlessAuthenticationBackend().authenticate(make_login_token('user@mail.com'))
+
+        marker = UsedLoginToken.objects.get()
+        self.assertAlmostEqual(marker.expires_at, timezone.now() + timedelta(hours=1), delta=timedelta(minutes=1))
+
+    @override_settings(LOGIN_TOKEN_SINGLE_USE=False)
+    def test_replay_protection_is_optional(self):
+        """тест: защиту от повторного входа можно отключить"""
+
+        token = make_login_token('user@mail.com')
+        backend = PasswordlessAuthenticationBackend()
+        self.assertIsNotNone(backend.authenticate(token))
+        self.assertIsNotNone(backend.authenticate(token))
+
+
 class GetUserTest(TestCase):
     """тест получения пользователя"""
 
+    def setUp(self):
+        # откат транзакции теста не сбрасывает кэш пользователей
+        user_cache.clear()
+
     def test_gets_user_by_email(self):
         """test: получить пользователя по email"""
 
@@ -57,3 +140,54 @@ class GetUserTest(TestCase):
 
         self.assertEqual(None, found_user)
 
+    def test_caches_found_user(self):
+        """тест: найденный пользователь берется из кэша без запроса к БД"""
+
+        User.objects.create(email="user@mail.com")
+        backend = PasswordlessAuthenticationBackend()
+        first = backend.get_user("user@mail.com")
+
+        with self.assertNumQueries(0):
+            second = backend.get_user("user@mail.com")
+
+        self.assertEqual(second, first)
+        self.assertIsNot(second, first)
+
+    def test_user_changes_invalidate_cache(self):
+        """тест: удаление пользователя сбрасывает его запись в кэше"""
+
+        user = User.objects.create(email="user@mail.com")
+        backend = PasswordlessAuthenticationBackend()
+        backend.get_user("user@mail.com")
+
+        user.delete()
+
+        self.assertIsNone(backend.get_user("user@mail.com"))
+
+    def test_cached_user_expires(self):
+        """тест: запись кэша устаревает через ttl"""
+
+        User.objects.create(email="user@mail.com")
+        backend = PasswordlessAuthenticationBackend()
+        with patch('accounts.authentication.time.monotonic', return_value=1000):
+            backend.get_user("user@mail.com")
+        with patch('accounts.authentication.time.monotonic', return_value=1000 + USER_CACHE_TTL):
+            with self.assertNumQueries(1):
+                backend.get_user("user@mail.com")
+
+
+class UserCacheTest(TestCase):
+    """тест кэша пользователей"""
+
+    def test_least_recently_used_user_is_evicted(self):
+        """тест: при переполнении вытесняется давно не нужный пользователь"""
+
+        cache = UserCache(max_size=2)
+        for email in ('a@mail.com', 'b@mail.com'):
+            cache.set(email, User(email=email))
+        cache.get('a@mail.com')
+        cache.set('c@mail.com', User(email='c@mail.com'))
+
+        self.assertIsNone(cache.get('b@mail.com'))
+        self.assertEqual(cache.get('a@mail.com').email, 'a@mail.com')
+        self.assertEqual(cache.get('c@mail.com').email, 'c@mail.com')
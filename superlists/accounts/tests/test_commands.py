@@ -0,0 +1,51 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import Token, UsedLoginToken
+
+
+class PurgeLoginTokensTest(TestCase):
+    """тест удаления просроченных токенов входа"""
+
+    def test_deletes_expired_tokens_in_batches(self):
+        """тест: просроченные токены удаляются пачками, действующие остаются"""
+
+        past = timezone.now() - timedelta(minutes=1)
+        for i in range(5):
+            Token.objects.create(email=f'user{i}@mail.com', expires_at=past)
+        valid = Token.objects.create(email='valid@mail.com')
+
+        out = StringIO()
+        call_command('purge_login_tokens', '--batch-size=2', stdout=out)
+
+        self.assertEqual(list(Token.objects.all()), [valid])
+        self.assertIn('5', out.getvalue())
+
+    def test_deletes_expired_used_token_markers(self):
+        """тест: истекшие отметки использованных токенов тоже удаляются"""
+
+        UsedLoginToken.objects.create(digest='old', expires_at=timezone.now() - timedelta(minutes=1))
+        valid = UsedLoginToken.objects.create(digest='valid', expires_at=timezone.now() + timedelta(minutes=1))
+
+        call_command('purge_login_tokens', stdout=StringIO())
+
+        self.assertEqual(list(UsedLoginToken.objects.all()), [valid])
+
+
+class SendQueuedMailCommandTest(TestCase):
+    """тест команды отправки писем из очереди"""
+
+    @patch('accounts.management.commands.send_queued_mail.send_queued_mail', side_effect=[2, 2, 1])
+    def test_sends_batches_until_queue_is_drained(self, mock_send):
+        """тест: пачки отправляются, пока очередь не опустеет"""
+
+        out = StringIO()
+        call_command('send_queued_mail', '--batch-size=2', stdout=out)
+
+        self.assertEqual(mock_send.call_count, 3)
+        self.assertIn('5', out.getvalue())
@@ -0,0 +1,131 @@
+from datetime import timedelta
+from smtplib import SMTPException
+from unittest.mock import patch
+
+from django.core import mail
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.mail import MAX_ATTEMPTS, queue_mail, retry_delay, send_queued_mail
+from accounts.models import OutgoingEmail
+
+
+class QueueMailTest(TestCase):
+    """тест очереди писем"""
+
+    def test_queues_mail_without_sending(self):
+        """тест: письмо сохраняется в очереди, а не отправляется сразу"""
+
+        queue_mail('subject', 'body', 'from@mail.com', ['a@mail.com', 'b@mail.com'])
+
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.recipients, 'a@mail.com\nb@mail.com')
+        self.assertEqual(len(mail.outbox), 0)
+
+
+class SendQueuedMailTest(TestCase):
+    """тест отправки писем из очереди"""
+
+    def test_sends_due_mail_and_removes_it_from_queue(self):
+        """тест: письма отправляются и удаляются из очереди"""
+
+        queue_mail('subject', 'body', 'from@mail.com', ['a@mail.com', 'b@mail.com'])
+        queue_mail('later', 'body', 'from@mail.com', ['c@mail.com'])
+        OutgoingEmail.objects.filter(subject='later').update(next_attempt_at=timezone.now() + timedelta(minutes=5))
+
+        sent = send_queued_mail()
+
+        self.assertEqual(sent, 1)
+        self.assertEqual(mail.outbox[0].subject, 'subject')
+        self.assertEqual(mail.outbox[0].to, ['a@mail.com', 'b@mail.com'])
+        self.assertEqual(list(OutgoingEmail.objects.values_list('subject', flat=True)), ['later'])
+
+    def test_batch_uses_one_connection(self):
+        """тест: пачка писем отправляется через одно соединение"""
+
+        for i in range(3):
+            queue_mail(f'subject {i}', 'body', 'from@mail.com', ['a@mail.com'])
+
+        with patch('accounts.mail.get_connection', wraps=mail.get_connection) as mock_get_connection:
+            send_queued_mail()
+
+        mock_get_connection.assert_called_once_with()
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_failed_mail_is_retried_with_backoff(self):
+        """тест: неудачное письмо откладывается со все большей задержкой"""
+
+        queue_mail('fails', 'body', 'from@mail.com', ['a@mail.com'])
+        queue_mail('works', 'body', 'from@mail.com', ['b@mail.com'])
+        original_send = mail.EmailMessage.send
+
+        def send(message, *args, **kwargs):
+            if message.subject == 'fails':
+                raise SMTPException('mailbox unavailable')
+            return original_send(message, *args, **kwargs)
+
+        with patch('django.core.mail.EmailMessage.send', send):
+            sent = send_queued_mail()
+
+        self.assertEqual(sent, 1)
+        self.assertEqual(mail.outbox[0].subject, 'works')
+        failed = OutgoingEmail.objects.get()
+        self.assertEqual(failed.attempts, 1)
+        self.assertIn('mailbox unavailable', failed.last_error)
+        self.assertGreater(failed.next_attempt_at, timezone.now())
+        self.assertEqual(send_queued_mail(), 0)
+
+    def test_unavailable_server_defers_batch(self):
+        """тест: если соединение не открывается, пачка откладывается без ошибки"""
+
+        queue_mail('first', 'body', 'from@mail.com', ['a@mail.com'])
+        queue_mail('second', 'body', 'from@mail.com', ['b@mail.com'])
+
+        with patch('django.core.mail.backends.locmem.EmailBackend.open', side_effect=ConnectionRefusedError):
+            sent = send_queued_mail()
+
+        self.assertEqual(sent, 0)
+        self.assertEqual(len(mail.outbox), 0)
+        for email in OutgoingEmail.objects.all():
+            self.assertEqual(email.attempts, 1)
+            self.assertIn('ConnectionRefusedError', email.last_error)
+            self.assertGreater(email.next_attempt_at, timezone.now())
+
+    def test_failed_reconnect_defers_rest_of_batch(self):
+        """тест: если после ошибки письма соединение не открывается, остаток пачки откладывается"""
+
+        for subject in ('fails', 'second', 'third'):
+            queue_mail(subject, 'body', 'from@mail.com', ['a@mail.com'])
+        opens = iter([None, ConnectionRefusedError()])
+
+        def open_connection(backend):
+            error = next(opens)
+            if error:
+                raise error
+
+        with patch('django.core.mail.backends.locmem.EmailBackend.open', open_connection), \
+                patch('django.core.mail.EmailMessage.send', side_effect=SMTPException('server gone')):
+            sent = send_queued_mail()
+
+        self.assertEqual(sent, 0)
+        self.assertEqual(
+            sorted(OutgoingEmail.objects.values_list('subject', 'attempts')),
+            [('fails', 1), ('second', 1), ('third', 1)],
+        )
+        self.assertIn('ConnectionRefusedError', OutgoingEmail.objects.get(subject='third').last_error)
+
+    def test_retry_delay_doubles_up_to_limit(self):
+        """тест: задержка удваивается, но не больше часа"""
+
+        self.assertEqual(retry_delay(1), timedelta(minutes=1))
+        self.assertEqual(retry_delay(3), timedelta(minutes=4))
+        self.assertEqual(retry_delay(20), timedelta(hours=1))
+
+    def test_gives_up_after_max_attempts(self):
+        """тест: после предельного числа попыток письмо больше не отправляется"""
+
+        queue_mail('subject', 'body', 'from@mail.com', ['a@mail.com'])
+        OutgoingEmail.objects.update(attempts=MAX_ATTEMPTS)
+
+        self.assertEqual(send_queued_mail(), 0)
+        self.assertEqual(len(mail.outbox), 0)
@@ -1,7 +1,9 @@
+from datetime import timedelta
+
 from django.contrib import auth
 from django.contrib.auth import get_user_model
 from django.test import TestCase
-from accounts.models import Token
+from accounts.models import TOKEN_LIFETIME, Token
 
 User = get_user_model()
 
@@ -40,3 +42,9 @@ class TokenModelTest(TestCase):
         token2 = Token.objects.create(email="user@mail.com")
 
         self.assertNotEqual(token1.uid, token2.uid)
+
+    def test_expires_after_lifetime(self):
+        """тест: токен действует ограниченное время"""
+
+        token = Token.objects.create(email="user@mail.com")
+        self.assertAlmostEqual(token.expires_at - token.created_at, TOKEN_LIFETIME, delta=timedelta(seconds=1))
@@ -1,9 +1,12 @@
-from django.test import TestCase
+from django.core import mail
+from django.core.cache import caches
+from django.test import TestCase, override_settings
 
 import accounts.views
 from unittest.mock import patch, call
 
-from accounts.models import Token
+from accounts.models import OutgoingEmail, Token
+from superlists.throttle import THROTTLE_CACHE
 
 
 class SendLoginEmailViewTest(TestCase):
@@ -18,18 +21,16 @@ class SendLoginEmailViewTest(TestCase):
 
         self.assertRedirects(response, '/')
 
-    @patch('accounts.views.send_mail')
-    def test_sends_mail_to_address_from_post(self, mock_send_mail):
+    @patch('accounts.views.queue_mail')
+    def test_sends_mail_to_address_from_post(self, mock_queue_mail):
         """test: отправка email из пост запроса"""
 
-        self.send_mail_called = False
-
         response = self.client.post('/accounts/send_login_email', data={
             'email': 'user@mail.com'
         })
 
-        self.assertTrue(mock_send_mail.called)
-        (subject, body, from_email, to_list), kwargs = mock_send_mail.call_args
+        self.assertTrue(mock_queue_mail.called)
+        (subject, body, from_email, to_list), kwargs = mock_queue_mail.call_args
         self.assertEqual(subject, 'Ссылка для входа на сайт списков')
         self.assertEqual(from_email, 'al-fa-y@yandex.ru')
         self.assertEqual(to_list, ['user@mail.com'])
@@ -54,8 +55,8 @@ class SendLoginEmailViewTest(TestCase):
         token = Token.objects.first()
         self.assertEqual(token.email, 'user@mail.com')
 
-    @patch('accounts.views.send_mail')
-    def test_sends_link_to_login_using_token_uid(self, mock_send_mail):
+    @patch('accounts.views.queue_mail')
+    def test_sends_link_to_login_using_token_uid(self, mock_queue_mail):
         """тест: отправка ссылки на вход"""
 
         response = self.client.post('/accounts/send_login_email', data={
@@ -64,9 +65,43 @@ class SendLoginEmailViewTest(TestCase):
 
         token = Token.objects.first()
         expected_url = f'http://testserver/accounts/login?token={token.uid}'
-        (subject, body, from_email, to_list), kwargs = mock_send_mail.call_args
+        (subject, body, from_email, to_list), kwargs = mock_queue_mail.call_args
         self.assertIn(expected_url, body)
 
+    def test_queues_mail_instead_of_sending(self):
+        """тест: письмо ставится в очередь, а не отправляется во время запроса"""
+
+        self.client.post('/accounts/send_login_email', data={'email': 'user@mail.com'})
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutgoingEmail.objects.get().recipients, 'user@mail.com')
+
+    @override_settings(LOGIN_TOKEN_MODE='signed')
+    @patch('accounts.views.queue_mail')
+    def test_signed_mode_sends_link_without_db_token(self, mock_queue_mail):
+        """тест: в режиме подписанных токенов ссылка отправляется без записи в БД"""
+
+        with self.assertNumQueries(0):
+            self.client.post('/accounts/send_login_email', data={'email': 'user@mail.com'})
+
+        (subject, body, from_email, to_list), kwargs = mock_queue_mail.call_args
+        self.assertIn('http://testserver/accounts/login?token=', body)
+        self.assertFalse(Token.objects.exists())
+
+    @override_settings(THROTTLE_RATES={'send_login_email': {'ip': (10, 60), 'email': (1, 600)}})
+    @patch('accounts.views.queue_mail')
+    def test_limits_login_emails_per_address(self, mock_queue_mail):
+        """тест: на один адрес часто ссылки не отправляются"""
+
+        caches[THROTTLE_CACHE].clear()
+        self.addCleanup(caches[THROTTLE_CACHE].clear)
+        self.client.post('/accounts/send_login_email', data={'email': 'user@mail.com'})
+        response = self.client.post('/accounts/send_login_email', data={'email': 'user@mail.com'})
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '600')
+        self.assertEqual(mock_queue_mail.call_count, 1)
+
 
 @patch('accounts.views.auth')
 class LoginViewTest(TestCase):
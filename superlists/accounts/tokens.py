@@ -0,0 +1,60 @@
+import hashlib
+
+from django.conf import settings
+from django.core import signing
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from accounts.models import TOKEN_LIFETIME, Token, UsedLoginToken
+
+DB_TOKENS = 'db'
+SIGNED_TOKENS = 'signed'
+SIGNED_TOKEN_SALT = 'accounts.login-token'
+
+
+def make_login_token(email):
+    """токен для ссылки входа в режиме settings.LOGIN_TOKEN_MODE
+
+    В режиме signed токен - подписанный SECRET_KEY адрес со временем выдачи,
+    его выдача обходится без БД, а проверка пишет в БД только отметку об использовании."""
+
+    if settings.LOGIN_TOKEN_MODE == SIGNED_TOKENS:
+        return signing.dumps(email, salt=SIGNED_TOKEN_SALT)
+    return str(Token.objects.create(email=email).uid)
+
+
+def use_login_token(token):
+    """адрес из действующего токена или None; токен после этого недействителен"""
+
+    if settings.LOGIN_TOKEN_MODE == SIGNED_TOKENS:
+        return _use_signed_token(token)
+    return _use_db_token(token)
+
+
+def _use_db_token(uid):
+    try:
+        token = Token.objects.get(uid=uid, expires_at__gt=timezone.now())
+    except Token.DoesNotExist:
+        return None
+    # одноразовый: если параллельный вход уже удалил токен, второй вход не проходит
+    if not Token.objects.filter(id=token.id).delete()[0]:
+        return None
+    return token.email
+
+
+def _use_signed_token(token):
+    try:
+        email = signing.loads(token or '', salt=SIGNED_TOKEN_SALT, max_age=TOKEN_LIFETIME)
+    except signing.BadSignature:
+        return None
+    if settings.LOGIN_TOKEN_SINGLE_USE:
+        # повторно тот же токен не пройдет, пока отметку не удалит purge_login_tokens
+        try:
+            with transaction.atomic():
+                UsedLoginToken.objects.create(
+                    digest=hashlib.sha256(token.encode()).hexdigest(),
+                    expires_at=timezone.now() + TOKEN_LIFETIME,
+                )
+        except IntegrityError:
+            return None
+    return email
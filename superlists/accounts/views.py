@@ -1,20 +1,21 @@
 from django.contrib import messages, auth
-from django.core.mail import send_mail
 from django.shortcuts import render, redirect
 from django.urls import reverse
 
-from accounts.models import Token
+from accounts.mail import queue_mail
+from accounts.tokens import make_login_token
+from superlists.throttle import throttle
 
 
+@throttle('send_login_email', email=lambda request: request.POST.get('email'))
 def send_login_email(request):
     """отправка ссылки для входа на email"""
 
     email = request.POST['email']
-    token = Token.objects.create(email=email)
     url = request.build_absolute_uri(
-        reverse('login') + '?token=' + str(token.uid)
+        reverse('login') + '?token=' + make_login_token(email)
     )
-    send_mail(
+    queue_mail(
         'Ссылка для входа на сайт списков',
         f'Чтобы войти на сайт перейдите по ссылке: \n{url}',
         'al-fa-y@yandex.ru',
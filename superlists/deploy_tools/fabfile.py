@@ -25,6 +25,7 @@ def deploy():
     _update_database(source_folder, virtualenv_folder)
 
     _configure_gunicorn_service(source_folder)
+    _configure_mail_worker_service(source_folder)
     _configure_nginx(source_folder)
 
 
@@ -99,6 +100,23 @@ def _configure_gunicorn_service(source_folder):
         f'sudo systemctl start {env.host}')
 
 
+def _configure_mail_worker_service(source_folder):
+    """конфигурируем отправку писем из очереди как сервис"""
+
+    worker_conf_template = source_folder + '/superlists/deploy_tools/mail-worker-systemd.template.service'
+    worker_service = f'{env.host}-mail'
+    worker_conf_service = f'/etc/systemd/system/{worker_service}.service'
+    run(f'sudo cp {worker_conf_template} {worker_conf_service}')
+
+    sed(worker_conf_service, "SITENAME", env.host, use_sudo=True)
+    sed(worker_conf_service, "USERNAME", env.user, use_sudo=True)
+    sed(worker_conf_service, "EMAIL_PASSWORD_YANDEX", EMAIL_PASSWORD, use_sudo=True)
+
+    run(f'sudo systemctl daemon-reload && '
+        f'sudo systemctl enable {worker_service} && '
+        f'sudo systemctl restart {worker_service}')
+
+
 def _configure_nginx(source_folder):
     """конфигурирование nginx"""
 
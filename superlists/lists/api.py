@@ -0,0 +1,195 @@
+import json
+
+from django.db.models import Min
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_http_methods
+
+from lists.forms import import_items
+from lists.models import Item, List, ListChange
+from lists.pagination import keyset_page, parse_cursor
+from lists.suggest import indexes as suggest_indexes
+from lists.sync import apply_operations, sync_scope
+
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 1000
+API_MAX_BATCH_SIZE = 1000
+
+NOT_FOUND_ERROR = 'Список не найден'
+NOT_AUTHENTICATED_ERROR = 'Нужно войти на сайт'
+FORBIDDEN_ERROR = 'Удалять элементы может только владелец списка'
+INVALID_JSON_ERROR = 'Тело запроса должно быть JSON-объектом'
+UNSUPPORTED_MEDIA_TYPE_ERROR = 'Ожидается Content-Type: application/json'
+INVALID_BATCH_ERROR = f'add — список строк, remove — список id, вместе не больше {API_MAX_BATCH_SIZE}'
+INVALID_OPERATIONS_ERROR = f'operations — список объектов с ключом key, не больше {API_MAX_BATCH_SIZE}'
+
+
+def _error(message, status):
+    return JsonResponse({'error': message}, status=status)
+
+
+def _page_size(request):
+    """размер страницы из параметра limit в допустимых пределах"""
+
+    limit = parse_cursor(request.GET.get('limit')) or API_PAGE_SIZE
+    return max(1, min(limit, API_MAX_PAGE_SIZE))
+
+
+@require_GET
+def lists(request):
+    """списки, которыми владеет или которые доступны вошедшему пользователю"""
+
+    if not request.user.is_authenticated:
+        return _error(NOT_AUTHENTICATED_ERROR, 401)
+    page = keyset_page(
+        List.objects.available_to(request.user.email).distinct().summaries(),
+        cursor=parse_cursor(request.GET.get('before')),
+        size=_page_size(request),
+        descending=True,
+    )
+    return JsonResponse({'lists': page.items, 'next': page.next_cursor})
+
+
+@require_GET
+def list_detail(request, list_id):
+    """список без элементов; адреса владельца и получателей видит только владелец"""
+
+    list_ = List.objects.filter(id=list_id).values('id', 'name', 'owner_id', 'modified_at').first()
+    if list_ is None:
+        return _error(NOT_FOUND_ERROR, 404)
+    owner = list_.pop('owner_id')
+    if owner is not None and owner == getattr(request.user, 'email', None):
+        list_['owner'] = owner
+        list_['shared_with'] = list(
+            List.shared_with.through.objects.filter(list_id=list_id).values_list('user_id', flat=True)
+        )
+    return JsonResponse(list_)
+
+
+@require_GET
+def suggest(request):
+    """самые частые тексты элементов вошедшего пользователя, начинающиеся с prefix"""
+
+    if not request.user.is_authenticated:
+        return _error(NOT_AUTHENTICATED_ERROR, 401)
+    prefix = request.GET.get('prefix', '').strip()
+    return JsonResponse({'suggestions': suggest_indexes.suggest(request.user.email, prefix)})
+
+
+# клиенты API не получают CSRF-токен; подделать запрос с application/json
+# без CORS-preflight браузер не даст, поэтому другой Content-Type отвергается
+@csrf_exempt
+@require_http_methods(['GET', 'POST'])
+def list_items(request, list_id):
+    """элементы списка: чтение по курсору и пакетное изменение"""
+
+    if request.method == 'POST':
+        return _change_items(request, list_id)
+
+    if not List.objects.filter(id=list_id).exists():
+        return _error(NOT_FOUND_ERROR, 404)
+    List.mark_accessed(int(list_id))
+    page = keyset_page(
+        Item.objects.filter(list_id=list_id).values('id', 'text'),
+        cursor=parse_cursor(request.GET.get('after')),
+        size=_page_size(request),
+    )
+    return JsonResponse({'items': page.items, 'next': page.next_cursor})
+
+
+def _json_body(request):
+    """разобрать тело запроса-JSON-объекта; возвращает (данные, ответ с ошибкой)"""
+
+    if request.content_type != 'application/json':
+        return None, _error(UNSUPPORTED_MEDIA_TYPE_ERROR, 415)
+    try:
+        data = json.loads(request.body.decode())
+    except ValueError:
+        return None, _error(INVALID_JSON_ERROR, 400)
+    if not isinstance(data, dict):
+        return None, _error(INVALID_JSON_ERROR, 400)
+    return data, None
+
+
+def _change_items(request, list_id):
+    """добавить и удалить элементы одним запросом"""
+
+    batch, error = _json_body(request)
+    if error:
+        return error
+
+    add = batch.get('add', [])
+    remove = batch.get('remove', [])
+    if not (isinstance(add, list) and all(isinstance(text, str) for text in add)
+            and isinstance(remove, list) and all(type(item_id) is int for item_id in remove)
+            and len(add) + len(remove) <= API_MAX_BATCH_SIZE):
+        return _error(INVALID_BATCH_ERROR, 400)
+
+    list_ = List.objects.filter(id=list_id).first()
+    if list_ is None:
+        return _error(NOT_FOUND_ERROR, 404)
+    # как и удаление списка: из списка с владельцем удаляет только владелец
+    if remove and list_.owner_id is not None and list_.owner_id != getattr(request.user, 'email', None):
+        return _error(FORBIDDEN_ERROR, 403)
+
+    removed = 0
+    if remove:
+        removed = Item.objects.delete_many(list_, remove)
+    report = import_items(list_, add)
+    return JsonResponse({
+        'added': report.created,
+        'removed': removed,
+        'errors': [
+            {'index': error.line - 1, 'text': error.text, 'error': error.error}
+            for error in report.errors
+        ],
+    })
+
+
+@require_GET
+def list_changes(request, list_id):
+    """изменения списка после курсора since
+
+    reset означает, что часть изменений после курсора уже удалена при сжатии журнала
+    и клиенту нужно заново прочитать элементы целиком."""
+
+    since = parse_cursor(request.GET.get('since')) or 0
+    oldest = ListChange.objects.aggregate(oldest=Min('id'))['oldest']
+    page = keyset_page(
+        ListChange.objects.filter(list_id=list_id).values('id', 'kind', 'item_id', 'text', 'email', 'created_at'),
+        cursor=since,
+        size=_page_size(request),
+    )
+    changes = [dict(change, seq=change.pop('id')) for change in page.items]
+    # адреса получателей видит только владелец, иначе по номерам списков их можно собрать
+    if any(change['email'] for change in changes) and not _is_owner(request, list_id):
+        for change in changes:
+            change['email'] = ''
+    return JsonResponse({
+        'changes': changes,
+        'next': changes[-1]['seq'] if changes else since,
+        'more': page.next_cursor is not None,
+        'reset': oldest is not None and since < oldest - 1,
+    })
+
+
+def _is_owner(request, list_id):
+    owner = List.objects.filter(id=list_id).values_list('owner_id', flat=True).first()
+    return owner is not None and owner == getattr(request.user, 'email', None)
+
+
+@csrf_exempt
+@require_http_methods(['POST'])
+def sync(request):
+    """применить накопленные клиентом офлайн операции с ключами идемпотентности"""
+
+    batch, error = _json_body(request)
+    if error:
+        return error
+
+    operations = batch.get('operations')
+    if not (isinstance(operations, list) and len(operations) <= API_MAX_BATCH_SIZE
+            and all(isinstance(operation, dict) and isinstance(operation.get('key'), str)
+                    and 0 < len(operation['key']) <= 64 for operation in operations)):
+        return _error(INVALID_OPERATIONS_ERROR, 400)
+    return JsonResponse({'results': apply_operations(operations, request.user, sync_scope(request))})
@@ -0,0 +1,12 @@
+from django.conf.urls import url
+
+from lists import api
+
+urlpatterns = [
+    url(r'^$', api.lists, name='api_lists'),
+    url(r'^sync$', api.sync, name='api_sync'),
+    url(r'^suggest$', api.suggest, name='api_suggest'),
+    url(r'^(\d+)/$', api.list_detail, name='api_list'),
+    url(r'^(\d+)/items/$', api.list_items, name='api_list_items'),
+    url(r'^(\d+)/changes/$', api.list_changes, name='api_list_changes'),
+]
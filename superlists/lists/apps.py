@@ -1,5 +1,11 @@
 from django.apps import AppConfig
+from django.core.checks import register
 
 
 class ListsConfig(AppConfig):
     name = 'lists'
+
+    def ready(self):
+        from lists import receivers  # noqa: F401
+        from lists.checks import check_sqlite_version
+        register(check_sqlite_version)
@@ -0,0 +1,19 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.checks import Error
+
+SQLITE_MIN_VERSION = (3, 24)
+
+
+def check_sqlite_version(app_configs, **kwargs):
+    """элементы добавляются через INSERT ... ON CONFLICT DO NOTHING, он есть в SQLite с 3.24"""
+
+    engines = {database['ENGINE'] for database in settings.DATABASES.values()}
+    if 'django.db.backends.sqlite3' not in engines or sqlite3.sqlite_version_info >= SQLITE_MIN_VERSION:
+        return []
+    return [Error(
+        f'Нужен SQLite {".".join(map(str, SQLITE_MIN_VERSION))} или новее, установлен {sqlite3.sqlite_version}',
+        hint='Соберите Python с более новой libsqlite3 или используйте более новый дистрибутив',
+        id='lists.E001',
+    )]
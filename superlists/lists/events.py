@@ -0,0 +1,107 @@
+import json
+import queue
+import threading
+import time
+from collections import defaultdict
+
+SUBSCRIBER_QUEUE_SIZE = 100
+EVENTS_KEEPALIVE = 15
+EVENTS_MAX_DURATION = 5 * 60
+# каждый поток занимает поток gunicorn целиком: остальные потоки остаются обычным запросам,
+# а не вместившиеся страницы опрашивают журнал изменений
+EVENTS_MAX_SUBSCRIBERS = 8
+
+
+class ListEventHub(object):
+    """внутрипроцессный издатель-подписчик событий списков
+
+    Подписчики живут в памяти процесса, поэтому сайт с потоком событий
+    запускается одним процессом gunicorn с потоками (см. deploy_tools)."""
+
+    def __init__(self, max_subscribers=EVENTS_MAX_SUBSCRIBERS):
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+        self._count = 0
+
+    def subscribe(self, list_id):
+        """подписаться на события списка; возвращает очередь событий
+        или None, если подписчиков уже max_subscribers"""
+
+        subscription = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                return None
+            self._subscribers[list_id].add(subscription)
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, list_id, subscription):
+        """отписаться от событий списка; повторная отписка ничего не делает"""
+
+        with self._lock:
+            subscribers = self._subscribers.get(list_id)
+            if subscribers is not None and subscription in subscribers:
+                subscribers.discard(subscription)
+                self._count -= 1
+                if not subscribers:
+                    del self._subscribers[list_id]
+
+    def publish(self, list_id, event):
+        """разослать событие подписчикам списка"""
+
+        with self._lock:
+            subscribers = list(self._subscribers.get(list_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait(event)
+            except queue.Full:
+                # отставший подписчик теряет событие, но не задерживает остальных
+                pass
+
+
+hub = ListEventHub()
+
+
+class EventStream(object):
+    """поток server-sent events списка; по истечении duration браузер переподключится сам
+
+    close() отписывает от событий, даже если поток так и не начали читать."""
+
+    def __init__(self, list_id, subscription, keepalive, duration):
+        self.list_id = list_id
+        self._subscription = subscription
+        self._events = self._generate(keepalive, duration)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._events)
+
+    def close(self):
+        self._events.close()
+        hub.unsubscribe(self.list_id, self._subscription)
+
+    def _generate(self, keepalive, duration):
+        try:
+            yield 'retry: 3000\n\n'
+            deadline = time.monotonic() + duration
+            while time.monotonic() < deadline:
+                try:
+                    event = self._subscription.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                yield f'event: {event["type"]}\ndata: {json.dumps(event)}\n\n'
+        finally:
+            hub.unsubscribe(self.list_id, self._subscription)
+
+
+def event_stream(list_id, keepalive=EVENTS_KEEPALIVE, duration=EVENTS_MAX_DURATION):
+    """поток событий списка или None, если мест для подписчиков нет"""
+
+    subscription = hub.subscribe(list_id)
+    if subscription is None:
+        return None
+    return EventStream(list_id, subscription, keepalive, duration)
@@ -0,0 +1,45 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from lists.pagination import keyset_chunks
+
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_FIELDS = ('list_id', 'list__name', 'id', 'text')
+EXPORT_HEADER = ('list_id', 'list_name', 'item_id', 'text')
+
+
+class _Echo(object):
+    """псевдофайл для csv.writer: возвращает записанную строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(items):
+    """строки экспорта элементов, читаемые из БД пачками по EXPORT_CHUNK_SIZE"""
+
+    for chunk in keyset_chunks(items.values(*EXPORT_FIELDS), EXPORT_CHUNK_SIZE):
+        for row in chunk:
+            yield tuple(row[field] for field in EXPORT_FIELDS)
+
+
+def csv_stream(items):
+    """экспорт элементов в CSV по строке"""
+
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_HEADER)
+    for row in export_rows(items):
+        yield writer.writerow(row)
+
+
+def json_stream(items):
+    """экспорт элементов JSON-массивом по объекту"""
+
+    yield '['
+    separator = '\n'
+    for row in export_rows(items):
+        yield separator + json.dumps(dict(zip(EXPORT_HEADER, row)), cls=DjangoJSONEncoder, ensure_ascii=False)
+        separator = ',\n'
+    yield '\n]\n'
@@ -1,11 +1,26 @@
+import csv
+import io
+from collections import namedtuple
+from itertools import islice
+
 from django import forms
 from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Max
 from django.forms.utils import ErrorList
 
-from lists.models import Item, List
+from lists.models import Item, List, text_hash
+from lists.signals import items_added
 
 EMPTY_ITEM_ERROR = 'Элементы списка не должны быть пустыми'
 DUPLICATE_ITEM_ERROR = 'Такой элемент уже присутствует в списке'
+EMPTY_IMPORT_ERROR = 'Вставьте текст или выберите файл'
+ENCODING_IMPORT_ERROR = 'Файл должен быть в кодировке UTF-8, строка {line} не читается'
+
+IMPORT_CHUNK_SIZE = 500
+
+ImportReport = namedtuple('ImportReport', ['created', 'errors'])
+LineError = namedtuple('LineError', ['line', 'text', 'error'])
 
 
 class ItemForm(forms.ModelForm):
@@ -35,12 +50,24 @@ class ExistingListItemForm(ItemForm):
         self.instance.list = for_list
 
     def validate_unique(self):
+        self.instance.text_hash = text_hash(self.instance.text)
         try:
             self.instance.validate_unique()
         except ValidationError as e:
             e.error_dict = {'text': [DUPLICATE_ITEM_ERROR]}
             self._update_errors(e)
 
+    def save(self):
+        """сохранить элемент; если такой же текст успели добавить параллельно,
+        вернуть None и показать ошибку дубликата"""
+
+        if self.errors:
+            raise ValueError("The item could not be created because the data didn't validate.")
+        item = Item.objects.insert_unique(self.instance.list, self.instance.text)
+        if item is None:
+            self.add_error('text', DUPLICATE_ITEM_ERROR)
+        return item
+
 
 class NewListForm(ItemForm):
     """форма нового списка"""
@@ -50,3 +77,105 @@ class NewListForm(ItemForm):
             return List.create_new(first_item_text=self.cleaned_data['text'], owner=owner)
         else:
             return List.create_new(first_item_text=self.cleaned_data['text'])
+
+
+class ItemImportForm(forms.Form):
+    """форма массового импорта элементов в существующий список"""
+
+    text = forms.CharField(required=False, widget=forms.Textarea(attrs={
+        'placeholder': 'Один элемент на строку',
+        'class': 'form-control',
+        'rows': 10,
+    }))
+    file = forms.FileField(required=False)
+
+    def clean_file(self):
+        """файл читается построчно заранее: ошибка кодировки не должна оборвать импорт на середине"""
+
+        upload = self.cleaned_data.get('file')
+        if upload:
+            for line_no, line in enumerate(upload, start=1):
+                try:
+                    line.decode('utf-8-sig')
+                except UnicodeDecodeError:
+                    raise ValidationError(ENCODING_IMPORT_ERROR.format(line=line_no))
+            upload.seek(0)
+        return upload
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not cleaned_data.get('text') and not cleaned_data.get('file'):
+            raise ValidationError(EMPTY_IMPORT_ERROR)
+        return cleaned_data
+
+    def lines(self):
+        """строки импорта, читаемые потоком; из CSV берется первая колонка"""
+
+        upload = self.cleaned_data.get('file')
+        if not upload:
+            return io.StringIO(self.cleaned_data['text'])
+
+        lines = (line.decode('utf-8-sig') for line in upload)
+        if upload.name.lower().endswith('.csv'):
+            return (row[0] if row else '' for row in csv.reader(lines))
+        return lines
+
+    def save(self, for_list):
+        return import_items(for_list, self.lines())
+
+
+def import_items(list_, lines):
+    """добавить в список элементы из строк пачками по IMPORT_CHUNK_SIZE
+
+    Дубликаты ищутся одним запросом на пачку по индексированному хэшу текста
+    среди уже сохраненных элементов и по множеству принятых строк внутри импорта.
+    Остальное вставляется через ON CONFLICT DO NOTHING в транзакции на пачку:
+    текст, добавленный параллельно, тоже попадает в отчет как дубликат."""
+
+    created = 0
+    errors = []
+    seen = set()
+    numbered_lines = enumerate(lines, start=1)
+    chunk = list(islice(numbered_lines, IMPORT_CHUNK_SIZE))
+    while chunk:
+        candidates = {}
+        for line_no, text in chunk:
+            text = text.strip()
+            if not text:
+                errors.append(LineError(line_no, text, EMPTY_ITEM_ERROR))
+            elif text in seen or text in candidates:
+                errors.append(LineError(line_no, text, DUPLICATE_ITEM_ERROR))
+            else:
+                candidates[text] = line_no
+
+        hashes = {text_hash(text): text for text in candidates}
+        existing = set()
+        if hashes:
+            existing = set(
+                Item.objects.filter(list=list_, text_hash__in=hashes).order_by().values_list('text_hash', flat=True)
+            )
+        for hash_ in existing:
+            text = hashes.pop(hash_)
+            errors.append(LineError(candidates.pop(text), text, DUPLICATE_ITEM_ERROR))
+            seen.add(text)
+
+        if candidates:
+            with transaction.atomic():
+                # запись в начале транзакции занимает блокировку записи SQLite: до фиксации
+                # никто не добавит элементов, и новые id после last_id — только наши
+                list_.touch()
+                last_id = Item.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+                inserted = Item.objects.insert_many(list_, hashes.values())
+                new_items = list(Item.objects.filter(list=list_, text_hash__in=hashes, id__gt=last_id))
+                for hash_ in hashes.keys() - {item.text_hash for item in new_items}:
+                    errors.append(LineError(candidates[hashes[hash_]], hashes[hash_], DUPLICATE_ITEM_ERROR))
+                seen.update(candidates)
+                created += inserted
+                if inserted:
+                    if not list_.name:
+                        list_.update_name()
+                    items_added.send(sender=Item, list_id=list_.id, items=new_items)
+        chunk = list(islice(numbered_lines, IMPORT_CHUNK_SIZE))
+
+    errors.sort(key=lambda error: error.line)
+    return ImportReport(created, errors)
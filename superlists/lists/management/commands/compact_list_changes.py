@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+from django.utils import timezone
+
+from lists.models import ListChange
+
+
+class Command(BaseCommand):
+    """сжать журнал изменений списков, удалив старые записи пачками"""
+
+    help = 'Удаляет из журнала изменений списков записи старше заданного количества дней'
+
+    def add_arguments(self, parser):
+        """добавить аргументы"""
+        parser.add_argument('--days', type=int, default=30)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        """обработать"""
+        deleted = compact_list_changes(
+            older_than=timezone.now() - timedelta(days=options['days']),
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(f'Удалено записей журнала: {deleted}')
+
+
+def compact_list_changes(older_than, batch_size=1000):
+    """удалить записи журнала старше older_than, каждая пачка отдельным запросом
+
+    Самая новая запись остается всегда: по ней клиенты понимают,
+    что их курсор старше сжатой части журнала."""
+
+    newest = ListChange.objects.aggregate(newest=Max('id'))['newest']
+    deleted = 0
+    while newest is not None:
+        ids = list(
+            ListChange.objects.filter(created_at__lt=older_than, id__lt=newest)
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        deleted += ListChange.objects.filter(id__in=ids).delete()[0]
+    return deleted
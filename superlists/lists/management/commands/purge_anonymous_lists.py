@@ -0,0 +1,42 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from lists.models import DELETE_BATCH_SIZE, List
+
+
+class Command(BaseCommand):
+    """удалить заброшенные анонимные списки пачками"""
+
+    help = 'Удаляет списки без владельца, к которым не обращались и которые не меняли дольше срока хранения'
+
+    def add_arguments(self, parser):
+        """добавить аргументы"""
+        parser.add_argument('--days', type=int, default=settings.ANONYMOUS_LIST_RETENTION_DAYS)
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        """обработать"""
+        deleted = purge_anonymous_lists(
+            older_than=timezone.now() - timedelta(days=options['days']),
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(f'Удалено списков: {deleted}')
+
+
+def purge_anonymous_lists(older_than, batch_size=100):
+    """удалить списки без владельца, заброшенные до older_than, по batch_size списков за раз;
+    строки каждого списка удаляются короткими транзакциями по DELETE_BATCH_SIZE"""
+
+    deleted = 0
+    while True:
+        list_ids = list(
+            List.objects.filter(owner=None, last_accessed__lt=older_than, modified_at__lt=older_than)
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not list_ids:
+            return deleted
+        List.delete_fast_many(list_ids, DELETE_BATCH_SIZE)
+        deleted += len(list_ids)
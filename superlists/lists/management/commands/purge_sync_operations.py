@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from lists.models import SyncOperation
+from lists.sync import SYNC_OPERATION_LIFETIME
+
+
+class Command(BaseCommand):
+    """удалить старые записи выполненных операций синхронизации пачками"""
+
+    help = 'Удаляет записи операций синхронизации старше срока хранения ключей идемпотентности'
+
+    def add_arguments(self, parser):
+        """добавить аргументы"""
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        """обработать"""
+        deleted = purge_sync_operations(
+            older_than=timezone.now() - SYNC_OPERATION_LIFETIME,
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(f'Удалено операций синхронизации: {deleted}')
+
+
+def purge_sync_operations(older_than, batch_size=1000):
+    """удалить записи старше older_than, каждая пачка отдельным запросом"""
+
+    deleted = 0
+    while True:
+        ids = list(
+            SyncOperation.objects.filter(created_at__lt=older_than)
+            .order_by('created_at').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += SyncOperation.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from lists.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    """перестроить поисковый индекс элементов"""
+
+    help = 'Перестраивает полнотекстовый индекс FTS5 по текстам всех элементов'
+
+    def handle(self, *args, **options):
+        """обработать"""
+        rebuild_search_index()
+        self.stdout.write('Поисковый индекс перестроен')
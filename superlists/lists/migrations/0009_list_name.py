@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 19:22
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_list_names(apps, schema_editor):
+    """заполнить имена существующих списков текстом первого элемента"""
+
+    List = apps.get_model('lists', 'List')
+    Item = apps.get_model('lists', 'Item')
+    first_item_text = Item.objects.filter(list=OuterRef('pk')).order_by('id').values('text')[:1]
+    List.objects.update(name=Coalesce(Subquery(first_item_text), Value('')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0008_list_shared_with'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='list',
+            name='name',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.RunPython(fill_list_names, migrations.RunPython.noop),
+    ]
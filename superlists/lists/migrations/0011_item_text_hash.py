@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 19:28
+from __future__ import unicode_literals
+
+import hashlib
+
+from django.db import migrations, models, transaction
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def fill_text_hashes(apps, schema_editor):
+    """заполнить хэши текстов пачками, каждая пачка в своей транзакции"""
+
+    Item = apps.get_model('lists', 'Item')
+    connection = schema_editor.connection
+    table = connection.ops.quote_name(Item._meta.db_table)
+    last_id = 0
+    while True:
+        rows = list(
+            Item.objects.filter(id__gt=last_id).order_by('id').values_list('id', 'text')[:BACKFILL_BATCH_SIZE]
+        )
+        if not rows:
+            break
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.executemany(
+                f'UPDATE {table} SET text_hash = %s WHERE id = %s',
+                [(hashlib.sha256(text.encode()).hexdigest(), item_id) for item_id, text in rows]
+            )
+        last_id = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('lists', '0010_list_modified_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='text_hash',
+            field=models.CharField(default='', editable=False, max_length=64),
+        ),
+        migrations.RunPython(fill_text_hashes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 19:31
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0012_item_unique_text_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('list_id', models.IntegerField()),
+                ('kind', models.CharField(choices=[('item_added', 'Элемент добавлен'), ('item_removed', 'Элемент удален'), ('shared', 'Доступ открыт'), ('unshared', 'Доступ закрыт')], max_length=16)),
+                ('item_id', models.IntegerField(null=True)),
+                ('text', models.TextField(blank=True, default='')),
+                ('email', models.EmailField(blank=True, default='', max_length=254)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ('id',),
+            },
+        ),
+        migrations.AlterIndexTogether(
+            name='listchange',
+            index_together=set([('list_id', 'id')]),
+        ),
+    ]
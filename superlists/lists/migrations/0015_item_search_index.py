@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 20:05
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+# индекс текстов элементов FTS5 поверх lists_item (external content), триггеры держат его в актуальном состоянии
+CREATE_SEARCH_INDEX = [
+    "CREATE VIRTUAL TABLE lists_item_fts USING fts5(text, content='lists_item', content_rowid='id')",
+    "CREATE TRIGGER lists_item_fts_insert AFTER INSERT ON lists_item BEGIN "
+    "INSERT INTO lists_item_fts (rowid, text) VALUES (new.id, new.text); END",
+    "CREATE TRIGGER lists_item_fts_delete AFTER DELETE ON lists_item BEGIN "
+    "INSERT INTO lists_item_fts (lists_item_fts, rowid, text) VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER lists_item_fts_update AFTER UPDATE OF text ON lists_item BEGIN "
+    "INSERT INTO lists_item_fts (lists_item_fts, rowid, text) VALUES ('delete', old.id, old.text); "
+    "INSERT INTO lists_item_fts (rowid, text) VALUES (new.id, new.text); END",
+    "INSERT INTO lists_item_fts (lists_item_fts) VALUES ('rebuild')",
+]
+
+DROP_SEARCH_INDEX = [
+    "DROP TRIGGER IF EXISTS lists_item_fts_insert",
+    "DROP TRIGGER IF EXISTS lists_item_fts_delete",
+    "DROP TRIGGER IF EXISTS lists_item_fts_update",
+    "DROP TABLE IF EXISTS lists_item_fts",
+]
+
+
+def run_on_sqlite(statements):
+    """выполнить запросы только на SQLite: на других базах поиск работает без индекса"""
+
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0014_syncoperation'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_sqlite(CREATE_SEARCH_INDEX), run_on_sqlite(DROP_SEARCH_INDEX)),
+    ]
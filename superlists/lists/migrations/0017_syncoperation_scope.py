@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 19:57
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0016_list_last_accessed'),
+    ]
+
+    # ключ перестает быть первичным: таблица пересоздается, старые записи идемпотентности теряются
+    operations = [
+        migrations.DeleteModel(
+            name='SyncOperation',
+        ),
+        migrations.CreateModel(
+            name='SyncOperation',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=260)),
+                ('key', models.CharField(max_length=64)),
+                ('result', models.TextField()),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='syncoperation',
+            unique_together=set([('scope', 'key')]),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 20:09
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0017_syncoperation_scope'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncoperation',
+            name='fingerprint',
+            field=models.CharField(default='', max_length=64),
+        ),
+    ]
@@ -1,40 +1,342 @@
+import hashlib
+
 from django.conf import settings
-from django.db import models
+from django.core.cache import cache
+from django.db import connection, models, transaction
+from django.db.models import Count, IntegerField, Max, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 # Create your models here.
 from django.urls import reverse
 
+from lists.signals import items_added, items_removed, list_deleted
+
+# пачка прямого удаления: короткие транзакции не держат блокировку записи SQLite подолгу
+DELETE_BATCH_SIZE = 500
+# строк в одном INSERT: по три параметра на строку укладываются в лимит SQLite в 999
+INSERT_BATCH_SIZE = 300
+# время последнего обращения к списку пишется в БД не чаще раза за интервал
+ACCESS_MARK_INTERVAL = 24 * 60 * 60
+
+
+def text_hash(text):
+    """хэш текста элемента для индексированной проверки дубликатов"""
+
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _delete_in_batches(model, column, values, batch_size):
+    """удалить строки модели с column из values прямыми DELETE, каждая пачка в своей транзакции"""
+
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(column)
+    placeholders = ', '.join(['%s'] * len(values))
+    deleted = 0
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {table} WHERE id IN '
+                f'(SELECT id FROM {table} WHERE {column} IN ({placeholders}) LIMIT %s)',
+                [*values, batch_size]
+            )
+            count = cursor.rowcount
+        deleted += count
+        if count < batch_size:
+            return deleted
+
+
+class ListQuerySet(models.QuerySet):
+    """выборка списков"""
+
+    def available_to(self, email):
+        """списки, которыми пользователь владеет или которые ему доступны"""
+
+        return self.filter(Q(owner_id=email) | Q(shared_with=email))
+
+    def last_change(self):
+        """количество списков и время последнего изменения среди них"""
+
+        return self.aggregate(count=Count('id', distinct=True), modified_at=Max('modified_at'))
+
+    def summaries(self):
+        """сводка по спискам: id, имя, количество элементов и время изменения"""
+
+        item_count = Item.objects.filter(list=OuterRef('pk')).order_by().values('list').annotate(
+            count=Count('*')
+        ).values('count')
+        return self.annotate(
+            item_count=Coalesce(Subquery(item_count, output_field=IntegerField()), Value(0))
+        ).values('id', 'name', 'item_count', 'modified_at')
+
 
 class List(models.Model):
     """модель списка"""
 
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, blank=True, null=True)
     shared_with = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name="available_lists")
+    name = models.TextField(blank=True, default='')
+    modified_at = models.DateTimeField(default=timezone.now)
+    last_accessed = models.DateTimeField(default=timezone.now, db_index=True)
 
-    @property
-    def name(self):
-        return self.item_set.first().text
+    objects = ListQuerySet.as_manager()
 
     def get_absolute_url(self):
         return reverse('view_list', args=[self.id])
 
+    def touch(self, **fields):
+        """отметить изменение списка, заодно сохранив переданные поля"""
+
+        fields['modified_at'] = timezone.now()
+        for name, value in fields.items():
+            setattr(self, name, value)
+        List.objects.filter(id=self.id).update(**fields)
+
+    @staticmethod
+    def touch_many(list_ids):
+        """отметить изменение нескольких списков одним запросом"""
+
+        List.objects.filter(id__in=list_ids).update(modified_at=timezone.now())
+
+    @staticmethod
+    def mark_accessed(list_id):
+        """отметить обращение к списку; запись в БД не чаще раза в ACCESS_MARK_INTERVAL"""
+
+        if cache.add(f'list-accessed:{list_id}', True, ACCESS_MARK_INTERVAL):
+            List.objects.filter(id=list_id).update(last_accessed=timezone.now())
+
+    def update_name(self):
+        """пересчитать имя списка по первому элементу"""
+
+        first_text = self.item_set.values_list('text', flat=True).first()
+        self.touch(name=first_text or '')
+
+    def delete_fast(self, batch_size=DELETE_BATCH_SIZE):
+        """удалить список прямыми DELETE пачками, не загружая элементы и связи в память"""
+
+        List.delete_fast_many([self.id], batch_size)
+
+    @staticmethod
+    def delete_fast_many(list_ids, batch_size=DELETE_BATCH_SIZE):
+        """удалить несколько списков прямыми DELETE пачками по batch_size строк"""
+
+        list_ids = list(list_ids)
+        if not list_ids:
+            return
+        for model in (Item, List.shared_with.through, ListChange):
+            _delete_in_batches(model, 'list_id', list_ids, batch_size)
+        table = connection.ops.quote_name(List._meta.db_table)
+        placeholders = ', '.join(['%s'] * len(list_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {table} WHERE id IN ({placeholders})', list_ids)
+        for list_id in list_ids:
+            list_deleted.send(sender=List, list_id=list_id)
+
     @staticmethod
     def create_new(first_item_text, owner=None):
         """Создать новый"""
 
-        list_ = List.objects.create(owner=owner)
+        list_ = List.objects.create(owner=owner, name=first_item_text)
         Item.objects.create(text=first_item_text, list=list_)
         return list_
 
+    def clone(self, owner=None):
+        """копия списка: элементы копируются одним запросом в базе"""
+
+        with transaction.atomic():
+            list_ = List.objects.create(owner=owner, name=self.name)
+            Item.objects.copy_items(self, list_)
+        return list_
+
+    def merge(self, source):
+        """добавить в список элементы другого, пропуская уже имеющиеся тексты;
+        возвращает количество добавленных элементов"""
+
+        return Item.objects.copy_items(source, self)
+
+
+class ItemQuerySet(models.QuerySet):
+    """выборка элементов"""
+
+    def insert_unique(self, list_, text):
+        """добавить элемент в список одним запросом INSERT ... ON CONFLICT DO NOTHING
+
+        Проверка дубликата и запись выполняются базой атомарно, поэтому
+        параллельные добавления одного текста не приводят к IntegrityError.
+        Возвращает новый элемент или None, если такой текст в списке уже есть."""
+
+        item = Item(list=list_, text=text, text_hash=text_hash(text))
+        table = connection.ops.quote_name(Item._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (text, text_hash, list_id) VALUES (%s, %s, %s) '
+                f'ON CONFLICT (list_id, text_hash) DO NOTHING',
+                [item.text, item.text_hash, list_.id]
+            )
+            if cursor.rowcount == 0:
+                return None
+            item.id = cursor.lastrowid
+
+        item._state.adding = False
+        item.update_list(adding=True)
+        items_added.send(sender=Item, list_id=list_.id, items=[item])
+        return item
+
+    def insert_many(self, list_, texts, batch_size=INSERT_BATCH_SIZE):
+        """добавить тексты в список запросами INSERT ... ON CONFLICT DO NOTHING
+        пачками по batch_size строк; возвращает количество добавленных строк
+
+        Тексты, которые уже есть в списке, в том числе добавленные параллельно,
+        пропускаются базой. Сигналы и обновление списка остаются вызывающему."""
+
+        table = connection.ops.quote_name(Item._meta.db_table)
+        texts = list(texts)
+        inserted = 0
+        with connection.cursor() as cursor:
+            for start in range(0, len(texts), batch_size):
+                batch = texts[start:start + batch_size]
+                placeholders = ', '.join(['(%s, %s, %s)'] * len(batch))
+                params = []
+                for text in batch:
+                    params.extend([text, text_hash(text), list_.id])
+                cursor.execute(
+                    f'INSERT INTO {table} (text, text_hash, list_id) VALUES {placeholders} '
+                    f'ON CONFLICT (list_id, text_hash) DO NOTHING',
+                    params
+                )
+                inserted += cursor.rowcount
+        return inserted
+
+    def delete_many(self, list_, item_ids, batch_size=DELETE_BATCH_SIZE):
+        """удалить элементы списка прямыми DELETE пачками по batch_size, без загрузки объектов;
+        возвращает количество удаленных элементов"""
+
+        table = connection.ops.quote_name(Item._meta.db_table)
+        item_ids = list(item_ids)
+        deleted = 0
+        for start in range(0, len(item_ids), batch_size):
+            with transaction.atomic():
+                ids = list(Item.objects.filter(
+                    list_id=list_.id, id__in=item_ids[start:start + batch_size]
+                ).values_list('id', flat=True))
+                if not ids:
+                    continue
+                with connection.cursor() as cursor:
+                    placeholders = ', '.join(['%s'] * len(ids))
+                    cursor.execute(f'DELETE FROM {table} WHERE id IN ({placeholders})', ids)
+                items_removed.send(sender=Item, list_id=list_.id, item_ids=ids)
+            deleted += len(ids)
+        if deleted:
+            list_.update_name()
+        return deleted
+
+    def copy_items(self, source, target):
+        """скопировать элементы списка source в target одним запросом INSERT ... SELECT
+
+        Тексты, уже имеющиеся в target, пропускаются по уникальному индексу
+        (list_id, text_hash), порядок элементов сохраняется.
+        Возвращает количество добавленных элементов."""
+
+        table = connection.ops.quote_name(Item._meta.db_table)
+        with transaction.atomic():
+            last_id = Item.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+            with connection.cursor() as cursor:
+                # WHERE обязателен: без него SQLite принимает ON CONFLICT за условие соединения
+                cursor.execute(
+                    f'INSERT INTO {table} (text, text_hash, list_id) '
+                    f'SELECT text, text_hash, %s FROM {table} WHERE list_id = %s ORDER BY id '
+                    f'ON CONFLICT (list_id, text_hash) DO NOTHING',
+                    [target.id, source.id]
+                )
+                count = cursor.rowcount
+            if count:
+                if target.name:
+                    target.touch()
+                else:
+                    target.update_name()
+                items_added.send(sender=Item, list_id=target.id, items=None, after_id=last_id)
+        return count
+
 
 class Item(models.Model):
     """Элемент списка"""
     text = models.TextField(verbose_name='Текст', default='')
+    text_hash = models.CharField(max_length=64, default='', editable=False)
     list = models.ForeignKey(List, default=None)
 
+    objects = ItemQuerySet.as_manager()
+
     def __str__(self):
         return self.text
 
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        self.text_hash = text_hash(self.text)
+        super().save(*args, **kwargs)
+        self.update_list(adding)
+
+    def update_list(self, adding):
+        """обновить имя и время изменения списка после сохранения элемента"""
+
+        # новый элемент всегда последний, имя уже заданному списку он не меняет
+        if adding and self.list.name:
+            self.list.touch()
+        elif not self.list.item_set.filter(id__lt=self.id).exists():
+            self.list.touch(name=self.text)
+        else:
+            self.list.touch()
+
+    def delete(self, *args, **kwargs):
+        list_ = self.list
+        result = super().delete(*args, **kwargs)
+        list_.update_name()
+        return result
+
     class Meta:
         ordering = ('id',)
-        unique_together = ('text', 'list')
+        unique_together = ('list', 'text_hash')
+
+
+class ListChange(models.Model):
+    """запись журнала изменений списка; id задает порядок и служит курсором"""
+
+    ITEM_ADDED = 'item_added'
+    ITEM_REMOVED = 'item_removed'
+    SHARED = 'shared'
+    UNSHARED = 'unshared'
+    KIND_CHOICES = (
+        (ITEM_ADDED, 'Элемент добавлен'),
+        (ITEM_REMOVED, 'Элемент удален'),
+        (SHARED, 'Доступ открыт'),
+        (UNSHARED, 'Доступ закрыт'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    # без внешнего ключа: журнал не мешает быстро удалять списки и элементы
+    list_id = models.IntegerField()
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    item_id = models.IntegerField(null=True)
+    text = models.TextField(blank=True, default='')
+    email = models.EmailField(blank=True, default='')
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ('id',)
+        index_together = ('list_id', 'id')
+
+
+class SyncOperation(models.Model):
+    """выполненная операция синхронизации: ключ идемпотентности и ее результат
+
+    Ключи уникальны в пределах области scope (пользователь или сессия),
+    а записи старше SYNC_OPERATION_LIFETIME удаляет purge_sync_operations."""
+
+    scope = models.CharField(max_length=260)
+    key = models.CharField(max_length=64)
+    # хэш содержания: повтор ключа с другой операцией не получит чужой результат
+    fingerprint = models.CharField(max_length=64, default='')
+    result = models.TextField()
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        unique_together = ('scope', 'key')
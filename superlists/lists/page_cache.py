@@ -0,0 +1,52 @@
+import time
+
+from django.core.cache import cache
+
+BODY_TIMEOUT = 60 * 60 * 24
+
+
+def _version_key(list_id):
+    return f'list-version:{list_id}'
+
+
+def _body_key(list_id, version):
+    return f'list-body:{list_id}:{version}'
+
+
+def _initial_version():
+    """начальная версия: после вытеснения ключа не повторяет прежние значения"""
+
+    return int(time.time() * 1000)
+
+
+def get_version(list_id):
+    """текущая версия списка"""
+
+    key = _version_key(list_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(list_id):
+    """сменить версию списка, сделав недействительным его закэшированное тело"""
+
+    key = _version_key(list_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_version(), None)
+
+
+def get_body(list_id, version):
+    """закэшированное тело страницы списка или None"""
+
+    return cache.get(_body_key(list_id, version))
+
+
+def set_body(list_id, version, body):
+    """сохранить тело страницы списка для версии"""
+
+    cache.set(_body_key(list_id, version), body, BODY_TIMEOUT)
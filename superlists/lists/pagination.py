@@ -0,0 +1,50 @@
+from collections import namedtuple
+
+Page = namedtuple('Page', ['items', 'next_cursor'])
+
+
+def parse_cursor(value):
+    """разобрать курсор из параметра запроса"""
+
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def keyset_page(queryset, cursor=None, size=50, descending=False):
+    """страница выборки по ключу id, начиная сразу за курсором"""
+
+    if cursor is not None:
+        queryset = queryset.filter(**{'id__lt' if descending else 'id__gt': cursor})
+    rows = list(queryset.order_by('-id' if descending else 'id')[:size + 1])
+
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        last = rows[-1]
+        next_cursor = last['id'] if isinstance(last, dict) else last.id
+    return Page(rows, next_cursor)
+
+
+def page_url(request, param, cursor):
+    """ссылка на следующую страницу с сохранением остальных параметров запроса"""
+
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query[param] = cursor
+    return f'?{query.urlencode()}'
+
+
+def keyset_chunks(queryset, size):
+    """вся выборка частями по size строк; между частями курсор БД не удерживается"""
+
+    cursor = None
+    while True:
+        page = keyset_page(queryset, cursor=cursor, size=size)
+        if page.items:
+            yield page.items
+        if page.next_cursor is None:
+            return
+        cursor = page.next_cursor
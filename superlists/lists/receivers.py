@@ -0,0 +1,143 @@
+from django.db import connection, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from lists import page_cache
+from lists.events import hub
+from lists.models import Item, List, ListChange
+from lists.signals import items_added, items_removed, list_deleted
+from lists.suggest import indexes as suggest_indexes
+
+
+def list_changed(list_id):
+    """список изменился: сменить версию сразу и еще раз после фиксации транзакции,
+    чтобы читатель не закэшировал незафиксированное состояние под новой версией"""
+
+    page_cache.bump_version(list_id)
+    transaction.on_commit(lambda: page_cache.bump_version(list_id))
+
+
+@receiver(post_save, sender=List)
+def list_saved(sender, instance, created, **kwargs):
+    list_changed(instance.id)
+    if created and instance.owner_id:
+        suggest_indexes.list_created(instance.id, instance.owner_id)
+
+
+@receiver(post_save, sender=Item)
+def item_saved(sender, instance, created, **kwargs):
+    if created:
+        items_added.send(sender=Item, list_id=instance.list_id, items=[instance])
+    else:
+        list_changed(instance.list_id)
+
+
+@receiver(post_delete, sender=Item)
+def item_deleted(sender, instance, **kwargs):
+    items_removed.send(sender=Item, list_id=instance.list_id, item_ids=[instance.id])
+
+
+@receiver(items_added)
+@receiver(items_removed)
+@receiver(list_deleted)
+def list_items_changed(sender, list_id, **kwargs):
+    list_changed(list_id)
+
+
+@receiver(items_added)
+def publish_added_items(sender, list_id, items, **kwargs):
+    """после фиксации отправить новые элементы открытым страницам списка;
+    вместо целого скопированного набора страницам предлагается перезагрузиться"""
+
+    if items is None:
+        event = {'type': 'reload'}
+    else:
+        event = {'type': 'items', 'items': [{'id': item.id, 'text': item.text} for item in items]}
+    transaction.on_commit(lambda: hub.publish(list_id, event))
+
+
+@receiver(items_added)
+def index_added_items(sender, list_id, items, **kwargs):
+    """новые тексты сразу попадают в подсказки владельца списка"""
+
+    suggest_indexes.items_added(list_id, None if items is None else [item.text for item in items])
+
+
+@receiver(items_removed)
+@receiver(list_deleted)
+def forget_removed_items(sender, list_id, **kwargs):
+    """удаленные тексты пропадают из подсказок: индекс владельца сбрасывается сразу
+    и еще раз после фиксации, если его успели построить по старому состоянию"""
+
+    suggest_indexes.items_removed(list_id)
+    transaction.on_commit(lambda: suggest_indexes.items_removed(list_id))
+
+
+@receiver(items_added)
+def record_added_items(sender, list_id, items, after_id=None, **kwargs):
+    if items is None:
+        record_copied_items(list_id, after_id)
+        return
+    ListChange.objects.bulk_create(
+        ListChange(list_id=list_id, kind=ListChange.ITEM_ADDED, item_id=item.id, text=item.text)
+        for item in items
+    )
+
+
+def record_copied_items(list_id, after_id):
+    """записать в журнал элементы, вставленные одним запросом, тоже одним запросом"""
+
+    changes = connection.ops.quote_name(ListChange._meta.db_table)
+    items = connection.ops.quote_name(Item._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {changes} (list_id, kind, item_id, text, email, created_at) '
+            f'SELECT list_id, %s, id, text, %s, %s FROM {items} '
+            f'WHERE list_id = %s AND id > %s ORDER BY id',
+            [ListChange.ITEM_ADDED, '', connection.ops.adapt_datetimefield_value(timezone.now()),
+             list_id, after_id]
+        )
+
+
+@receiver(items_removed)
+def record_removed_items(sender, list_id, item_ids, **kwargs):
+    ListChange.objects.bulk_create(
+        ListChange(list_id=list_id, kind=ListChange.ITEM_REMOVED, item_id=item_id)
+        for item_id in item_ids
+    )
+
+
+@receiver(m2m_changed, sender=List.shared_with.through)
+def shared_with_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    through = List.shared_with.through
+    if action == 'pre_clear':
+        # после очистки уже не узнать, какие связи были
+        related = {'list_id': instance.id} if not reverse else {'user_id': instance.pk}
+        instance._cleared_shares = list(through.objects.filter(**related).values_list('list_id', 'user_id'))
+        return
+
+    if action == 'post_clear':
+        shares = getattr(instance, '_cleared_shares', [])
+    elif action in ('post_add', 'post_remove'):
+        if reverse:
+            shares = [(list_id, instance.pk) for list_id in pk_set]
+        else:
+            shares = [(instance.id, email) for email in pk_set]
+    else:
+        return
+    shared_lists_changed(shares, ListChange.SHARED if action == 'post_add' else ListChange.UNSHARED)
+
+
+def shared_lists_changed(shares, kind):
+    """изменился доступ к спискам: это меняет и страницы "мои списки" получателей"""
+
+    if not shares:
+        return
+    ListChange.objects.bulk_create(
+        ListChange(list_id=list_id, kind=kind, email=email) for list_id, email in shares
+    )
+    list_ids = {list_id for list_id, email in shares}
+    List.touch_many(list_ids)
+    for list_id in list_ids:
+        list_changed(list_id)
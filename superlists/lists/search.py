@@ -0,0 +1,58 @@
+from django.db import connection
+from django.db.models import F
+
+from lists.models import Item, List
+
+SEARCH_INDEX_TABLE = 'lists_item_fts'
+SEARCH_RESULTS_LIMIT = 50
+
+
+def has_search_index():
+    """индекс FTS5 создается миграцией только на SQLite"""
+
+    return connection.vendor == 'sqlite'
+
+
+def match_query(query):
+    """запрос FTS5 из введенной строки: каждое слово в кавычках, все слова обязательны
+
+    Кавычки не дают словам пользователя стать операторами FTS5 (AND, NEAR, * и т.п.)."""
+
+    return ' '.join('"{}"'.format(word.replace('"', '""')) for word in query.split())
+
+
+def search_items(email, query, limit=SEARCH_RESULTS_LIMIT):
+    """элементы своих и доступных пользователю списков по запросу, самые подходящие первыми;
+    у каждого элемента есть атрибут list_name"""
+
+    match = match_query(query)
+    if not match:
+        return []
+    available = List.objects.available_to(email).values('id')
+    if not has_search_index():
+        items = Item.objects.filter(list__in=available).annotate(list_name=F('list__name'))
+        for word in query.split():
+            items = items.filter(text__icontains=word)
+        return list(items[:limit])
+
+    lists_sql, lists_params = available.query.sql_with_params()
+    items = connection.ops.quote_name(Item._meta.db_table)
+    lists = connection.ops.quote_name(List._meta.db_table)
+    return list(Item.objects.raw(
+        f'SELECT item.id, item.text, item.list_id, item_list.name AS list_name '
+        f'FROM {SEARCH_INDEX_TABLE} '
+        f'JOIN {items} item ON item.id = {SEARCH_INDEX_TABLE}.rowid '
+        f'JOIN {lists} item_list ON item_list.id = item.list_id '
+        f'WHERE {SEARCH_INDEX_TABLE} MATCH %s AND item.list_id IN ({lists_sql}) '
+        f'ORDER BY bm25({SEARCH_INDEX_TABLE}) LIMIT %s',
+        [match, *lists_params, limit]
+    ))
+
+
+def rebuild_search_index():
+    """перестроить индекс по текущему содержимому таблицы элементов"""
+
+    if not has_search_index():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {SEARCH_INDEX_TABLE} ({SEARCH_INDEX_TABLE}) VALUES ('rebuild')")
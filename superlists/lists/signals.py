@@ -0,0 +1,10 @@
+from django.dispatch import Signal
+
+# добавление и удаление элементов, в том числе массовые, мимо Item.save/delete;
+# элементы, вставленные одним запросом INSERT ... SELECT, передаются как items=None
+# и after_id: новые элементы списка - те, у которых id больше after_id
+items_added = Signal(providing_args=['list_id', 'items', 'after_id'])
+items_removed = Signal(providing_args=['list_id', 'item_ids'])
+
+# список удален прямыми DELETE вместе с элементами и связями
+list_deleted = Signal(providing_args=['list_id'])
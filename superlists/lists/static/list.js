@@ -3,6 +3,220 @@ window.Superlists.initialize = function () {
     $('input[type="text"]').on('keypress', function () {
         $('.has-error').hide();
     });
+
+    $(window).on('scroll', window.Superlists.loadItemsNearBottom);
+    window.Superlists.loadItemsNearBottom();
+
+    if ($('#id_list_table').length) {
+        $('#id_text').closest('form').on('submit', window.Superlists.addItem);
+        window.Superlists.subscribeToItems();
+    } else {
+        // ключ идемпотентности: повторная отправка формы не создаст второй список
+        var key = $('<input type="hidden" name="key">').val(window.Superlists.newKey());
+        $('#id_text').closest('form').append(key);
+        // страница из кэша истории: новая отправка - уже другая операция
+        $(window).on('pageshow', function (event) {
+            if (event.originalEvent && event.originalEvent.persisted) {
+                key.val(window.Superlists.newKey());
+            }
+        });
+    }
+
+    window.Superlists.attachSuggestions($('#id_text'));
+
+    $(window).on('online', window.Superlists.flushQueue);
+    window.Superlists.flushQueue();
+};
+
+window.Superlists.SUGGEST_DELAY = 250;
+
+window.Superlists.attachSuggestions = function (input) {
+    // подсказки есть только у вошедших пользователей: адрес API выводит шаблон
+    var url = input.closest('form').attr('data-suggest-url');
+    if (!input.length || !url) {
+        return;
+    }
+    var datalist = $('<datalist id="id_suggestions">');
+    var timer = null;
+    input.attr('list', 'id_suggestions').after(datalist);
+    input.on('input', function () {
+        window.clearTimeout(timer);
+        // запрос уходит, когда пользователь перестал печатать
+        timer = window.setTimeout(function () {
+            var prefix = input.val();
+            if (!prefix) {
+                return;
+            }
+            $.get(url, {prefix: prefix}).done(function (response) {
+                // пока ответ шел, пользователь мог набрать дальше
+                if (input.val() !== prefix) {
+                    return;
+                }
+                datalist.empty();
+                response.suggestions.forEach(function (text) {
+                    datalist.append($('<option>').attr('value', text));
+                });
+            });
+        }, window.Superlists.SUGGEST_DELAY);
+    });
+};
+
+window.Superlists.QUEUE_KEY = 'superlists.queue';
+
+window.Superlists.newKey = function () {
+    return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2);
+};
+
+window.Superlists.readQueue = function () {
+    return JSON.parse(window.localStorage.getItem(window.Superlists.QUEUE_KEY) || '[]');
+};
+
+window.Superlists.enqueue = function (operation) {
+    var queue = window.Superlists.readQueue();
+    operation.key = window.Superlists.newKey();
+    queue.push(operation);
+    window.localStorage.setItem(window.Superlists.QUEUE_KEY, JSON.stringify(queue));
 };
 
+window.Superlists.flushQueue = function () {
+    var operations = window.Superlists.readQueue();
+    if (!operations.length || navigator.onLine === false) {
+        return;
+    }
+    $.ajax({
+        url: '/api/lists/sync',
+        method: 'POST',
+        contentType: 'application/json',
+        data: JSON.stringify({operations: operations})
+    }).done(function (response) {
+        var flushed = operations.map(function (operation) { return operation.key; });
+        var rest = window.Superlists.readQueue().filter(function (operation) {
+            return flushed.indexOf(operation.key) === -1;
+        });
+        window.localStorage.setItem(window.Superlists.QUEUE_KEY, JSON.stringify(rest));
 
+        var listId = Number($('#id_list_table').attr('data-list-id'));
+        window.Superlists.appendItems(response.results.filter(function (result, index) {
+            return result.item && operations[index].list === listId;
+        }).map(function (result) { return result.item; }));
+    });
+};
+
+window.Superlists.subscribeToItems = function () {
+    var url = $('#id_list_table').attr('data-events-url');
+    if (!url || !window.EventSource) {
+        return;
+    }
+    var source = new EventSource(url);
+    source.addEventListener('error', function () {
+        // сервер отказал в потоке (например, 503 - все места заняты): опрашивать журнал
+        if (source.readyState === EventSource.CLOSED) {
+            window.Superlists.pollChanges();
+        }
+    });
+    source.addEventListener('items', function (event) {
+        window.Superlists.appendItems(JSON.parse(event.data).items);
+    });
+    // в список скопировали целый набор элементов
+    source.addEventListener('reload', function () {
+        window.location.reload();
+    });
+};
+
+window.Superlists.POLL_INTERVAL = 5000;
+
+window.Superlists.pollChanges = function () {
+    var table = $('#id_list_table');
+    var url = table.attr('data-changes-url');
+    if (!url) {
+        return;
+    }
+    $.get(url, {since: table.attr('data-changes-since')}).done(function (response) {
+        if (response.reset) {
+            window.location.reload();
+            return;
+        }
+        table.attr('data-changes-since', response.next);
+        window.Superlists.appendItems(response.changes.filter(function (change) {
+            return change.kind === 'item_added';
+        }).map(function (change) {
+            return {id: change.item_id, text: change.text};
+        }));
+    }).always(function () {
+        window.setTimeout(window.Superlists.pollChanges, window.Superlists.POLL_INTERVAL);
+    });
+};
+
+window.Superlists.appendItems = function (items) {
+    var table = $('#id_list_table');
+    // пока не загружены все страницы, новые строки придут вместе с последней
+    if (table.attr('data-next-url')) {
+        return;
+    }
+    items.forEach(function (item) {
+        if (table.find('tr[data-id="' + item.id + '"]').length) {
+            return;
+        }
+        var number = table.find('tr').length + 1;
+        table.append($('<tr>').attr('data-id', item.id).append($('<td>').text(number + ': ' + item.text)));
+    });
+};
+
+window.Superlists.addItem = function (event) {
+    event.preventDefault();
+    var form = $(this);
+    var table = $('#id_list_table');
+    var data = form.serialize() + '&position=' + table.find('tr').length;
+
+    $.post(form.attr('action'), data).done(function (html) {
+        form.find('.has-error').remove();
+        $('#id_text').val('');
+        // пока не загружены все страницы, новая строка придет вместе с последней
+        if (!table.attr('data-next-url')) {
+            table.append(html);
+        }
+    }).fail(function (xhr) {
+        if (xhr.status === 400) {
+            form.find('.has-error').remove();
+            form.append(xhr.responseText);
+        } else if (xhr.status === 0) {
+            // нет связи: элемент уйдет пакетом, когда сеть вернется
+            window.Superlists.enqueue({
+                type: 'add_item',
+                list: Number(table.attr('data-list-id')),
+                text: $('#id_text').val()
+            });
+            $('#id_text').val('');
+        }
+    });
+};
+
+window.Superlists.loadItemsNearBottom = function () {
+    var bottom = $(window).scrollTop() + $(window).height();
+    if (bottom > $(document).height() - 200) {
+        window.Superlists.loadMoreItems();
+    }
+};
+
+window.Superlists.loadMoreItems = function () {
+    var table = $('#id_list_table');
+    var url = table.attr('data-next-url');
+    if (!url || table.data('loading')) {
+        return;
+    }
+
+    table.data('loading', true);
+    $.get(url).done(function (html, status, xhr) {
+        table.append(html);
+        var nextUrl = xhr.getResponseHeader('X-Next-Page');
+        if (nextUrl) {
+            table.attr('data-next-url', nextUrl);
+        } else {
+            table.removeAttr('data-next-url');
+        }
+        table.data('loading', false);
+        window.Superlists.loadItemsNearBottom();
+    }).fail(function () {
+        table.data('loading', false);
+    });
+};
@@ -0,0 +1,121 @@
+import heapq
+import threading
+from bisect import bisect_left, insort
+from collections import OrderedDict
+
+from django.db.models import Count
+
+from lists.models import Item, List
+
+SUGGEST_LIMIT = 10
+SUGGEST_MAX_USERS = 1000
+
+
+class PrefixIndex(object):
+    """тексты элементов пользователя, отсортированные без учета регистра, с частотами"""
+
+    def __init__(self, counts, list_ids=()):
+        self.list_ids = set(list_ids)
+        self._counts = dict(counts)
+        self._keys = sorted((text.lower(), text) for text in self._counts)
+
+    def add(self, text):
+        """учесть еще одно употребление текста"""
+
+        if text in self._counts:
+            self._counts[text] += 1
+        else:
+            self._counts[text] = 1
+            insort(self._keys, (text.lower(), text))
+
+    def suggest(self, prefix, limit=SUGGEST_LIMIT):
+        """самые частые тексты, начинающиеся с prefix"""
+
+        prefix = prefix.lower()
+        if not prefix:
+            return []
+        start = bisect_left(self._keys, (prefix,))
+        # prefix + максимальный символ больше любой строки с этим префиксом
+        end = bisect_left(self._keys, (prefix + '\U0010ffff',), start)
+        texts = (text for key, text in self._keys[start:end])
+        return heapq.nlargest(limit, texts, key=lambda text: (self._counts[text], text))
+
+
+class SuggestIndexes(object):
+    """префиксные индексы пользователей в памяти процесса, вытесняемые по LRU
+
+    Индекс строится лениво одним запросом при первой подсказке пользователю;
+    заодно запоминается, какие списки ему принадлежат, чтобы новые элементы
+    этих списков сразу попадали в индекс без обращения к БД."""
+
+    def __init__(self, max_users=SUGGEST_MAX_USERS):
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._indexes = OrderedDict()
+        self._list_owners = {}
+
+    def suggest(self, email, prefix, limit=SUGGEST_LIMIT):
+        """подсказки пользователю по началу текста"""
+
+        with self._lock:
+            index = self._indexes.get(email)
+            if index is not None:
+                self._indexes.move_to_end(email)
+                return index.suggest(prefix, limit)
+
+        index = self._build(email)
+        with self._lock:
+            self._indexes[email] = index
+            self._indexes.move_to_end(email)
+            self._list_owners.update((list_id, email) for list_id in index.list_ids)
+            while len(self._indexes) > self.max_users:
+                self._forget(next(iter(self._indexes)))
+            return index.suggest(prefix, limit)
+
+    def _build(self, email):
+        counts = Item.objects.filter(list__owner_id=email).order_by().values_list('text').annotate(Count('id'))
+        list_ids = List.objects.filter(owner_id=email).values_list('id', flat=True)
+        return PrefixIndex(counts, list_ids)
+
+    def _forget(self, email):
+        for list_id in self._indexes.pop(email).list_ids:
+            self._list_owners.pop(list_id, None)
+
+    def list_created(self, list_id, email):
+        """новый список пользователя с уже построенным индексом"""
+
+        with self._lock:
+            index = self._indexes.get(email)
+            if index is not None:
+                index.list_ids.add(list_id)
+                self._list_owners[list_id] = email
+
+    def items_added(self, list_id, texts):
+        """новые элементы списка; texts=None - неизвестно какие, индекс владельца строится заново"""
+
+        with self._lock:
+            email = self._list_owners.get(list_id)
+            if email is None:
+                return
+            if texts is None:
+                self._forget(email)
+                return
+            index = self._indexes[email]
+            for text in texts:
+                index.add(text)
+
+    def items_removed(self, list_id):
+        """из списка удалены элементы или он сам: индекс владельца строится заново"""
+
+        with self._lock:
+            email = self._list_owners.get(list_id)
+            if email is not None:
+                self._forget(email)
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+            self._list_owners.clear()
+
+
+indexes = SuggestIndexes()
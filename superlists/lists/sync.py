@@ -0,0 +1,115 @@
+import json
+from datetime import timedelta
+from uuid import uuid4
+
+from django.db import IntegrityError, transaction
+
+from lists.forms import DUPLICATE_ITEM_ERROR, EMPTY_ITEM_ERROR
+from lists.models import Item, List, SyncOperation, text_hash
+
+NEW_LIST = 'new_list'
+ADD_ITEM = 'add_item'
+
+LIST_NOT_FOUND_ERROR = 'Список не найден'
+UNKNOWN_OPERATION_ERROR = 'Неизвестная операция'
+INVALID_OPERATION_ERROR = 'Некорректная операция'
+KEY_REUSED_ERROR = 'Ключ уже использован для другой операции'
+
+# столько клиент может повторять операцию, не рискуя выполнить ее дважды
+SYNC_OPERATION_LIFETIME = timedelta(days=7)
+
+
+def sync_scope(request):
+    """область ключей идемпотентности: пользователь, а для анонимов — их сессия"""
+
+    if request.user.is_authenticated:
+        return f'user:{request.user.email}'
+    return 'session:' + request.session.setdefault('sync_scope', uuid4().hex)
+
+
+def apply_operations(operations, user, scope):
+    """применить пакет операций в одной транзакции, каждую — не больше одного раза
+
+    Операция с уже известным ключом не выполняется повторно, вместо этого
+    возвращается сохраненный результат, а если под ключом сохранена другая
+    операция — ошибка KEY_REUSED_ERROR. Если тот же пакет параллельно успел
+    зафиксироваться первым, пакет перечитывается с уже сохраненными результатами."""
+
+    try:
+        return _apply_operations(operations, user, scope)
+    except IntegrityError:
+        return _apply_operations(operations, user, scope)
+
+
+def _apply_operations(operations, user, scope):
+    keys = [operation['key'] for operation in operations]
+    with transaction.atomic():
+        done = {
+            key: (fingerprint, result) for key, fingerprint, result
+            in SyncOperation.objects.filter(scope=scope, key__in=keys).values_list('key', 'fingerprint', 'result')
+        }
+        applied = []
+        refs = {}
+        lists = {}
+        results = []
+        for operation in operations:
+            key = operation['key']
+            fingerprint = _fingerprint(operation)
+            if key not in done:
+                done[key] = (fingerprint, json.dumps(_apply(operation, user, refs, lists)))
+                applied.append(SyncOperation(scope=scope, key=key, fingerprint=fingerprint, result=done[key][1]))
+            if done[key][0] != fingerprint:
+                results.append(dict(_error(KEY_REUSED_ERROR), key=key))
+                continue
+            result = json.loads(done[key][1])
+            if operation.get('type') == NEW_LIST and isinstance(operation.get('ref'), str) and 'list' in result:
+                refs[operation['ref']] = result['list']
+            results.append(dict(result, key=key))
+        SyncOperation.objects.bulk_create(applied)
+    return results
+
+
+def _apply(operation, user, refs, lists):
+    """выполнить одну операцию; ref — ссылки на списки, созданные в этом же пакете"""
+
+    text = str(operation.get('text', '')).strip()
+    if operation.get('type') not in (NEW_LIST, ADD_ITEM):
+        return _error(UNKNOWN_OPERATION_ERROR)
+    if not _valid_references(operation):
+        return _error(INVALID_OPERATION_ERROR)
+    if not text:
+        return _error(EMPTY_ITEM_ERROR)
+
+    if operation['type'] == NEW_LIST:
+        list_ = List.create_new(first_item_text=text, owner=user if user.is_authenticated else None)
+        return {'status': 'ok', 'list': list_.id}
+
+    list_id = refs.get(operation.get('list_ref'), operation.get('list'))
+    if list_id not in lists:
+        lists[list_id] = List.objects.filter(id=list_id).first() if list_id is not None else None
+    if lists[list_id] is None:
+        return _error(LIST_NOT_FOUND_ERROR)
+    item = Item.objects.insert_unique(lists[list_id], text)
+    if item is None:
+        return _error(DUPLICATE_ITEM_ERROR)
+    return {'status': 'ok', 'item': {'id': item.id, 'text': item.text}}
+
+
+def _fingerprint(operation):
+    """хэш содержания операции: тип, текст и ссылки на список"""
+
+    content = [operation.get(name) for name in ('type', 'list', 'list_ref', 'ref')]
+    return text_hash(json.dumps(content + [str(operation.get('text', '')).strip()]))
+
+
+def _valid_references(operation):
+    """list — целое число, ref и list_ref — строки, если они переданы"""
+
+    list_id = operation.get('list')
+    if list_id is not None and (not isinstance(list_id, int) or isinstance(list_id, bool)):
+        return False
+    return all(operation.get(name) is None or isinstance(operation[name], str) for name in ('ref', 'list_ref'))
+
+
+def _error(message):
+    return {'status': 'error', 'error': message}
@@ -0,0 +1,342 @@
+import json
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+from lists.forms import DUPLICATE_ITEM_ERROR, EMPTY_ITEM_ERROR
+from lists.management.commands.compact_list_changes import compact_list_changes
+from lists.models import Item, List, ListChange
+from lists.suggest import indexes as suggest_indexes
+from lists.sync import INVALID_OPERATION_ERROR, KEY_REUSED_ERROR
+
+User = get_user_model()
+
+
+class ListsApiTest(TestCase):
+    """тест API списков пользователя"""
+
+    def test_requires_login(self):
+        """тест: без входа списки не отдаются"""
+
+        response = self.client.get('/api/lists/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_returns_owned_and_shared_lists(self):
+        """тест: отдаются свои и доступные списки"""
+
+        user = User.objects.create(email='user@mail.com')
+        own = List.create_new('own', owner=user)
+        shared = List.create_new('shared')
+        shared.shared_with.add(user)
+        List.create_new('other')
+        self.client.force_login(user)
+
+        response = self.client.get('/api/lists/')
+
+        names = [row['name'] for row in response.json()['lists']]
+        self.assertEqual(names, ['shared', 'own'])
+
+
+class ListDetailApiTest(TestCase):
+    """тест API одного списка"""
+
+    def test_returns_list_fields(self):
+        """тест: отдаются поля списка, владельцу - с адресами"""
+
+        owner = User.objects.create(email='owner@mail.com')
+        list_ = List.create_new('first', owner=owner)
+        list_.shared_with.add(User.objects.create(email='friend@mail.com'))
+        self.client.force_login(owner)
+
+        data = self.client.get(f'/api/lists/{list_.id}/').json()
+
+        self.assertEqual(data['id'], list_.id)
+        self.assertEqual(data['name'], 'first')
+        self.assertEqual(data['owner'], 'owner@mail.com')
+        self.assertEqual(data['shared_with'], ['friend@mail.com'])
+
+    def test_hides_addresses_from_other_users(self):
+        """тест: другим пользователям адреса владельца и получателей не отдаются"""
+
+        list_ = List.create_new('first', owner=User.objects.create(email='owner@mail.com'))
+        list_.shared_with.add(User.objects.create(email='friend@mail.com'))
+
+        data = self.client.get(f'/api/lists/{list_.id}/').json()
+
+        self.assertEqual(data['name'], 'first')
+        self.assertNotIn('owner', data)
+        self.assertNotIn('shared_with', data)
+
+    def test_missing_list_is_404(self):
+        """тест: несуществующий список — 404"""
+
+        response = self.client.get('/api/lists/100/')
+        self.assertEqual(response.status_code, 404)
+
+
+class ListItemsApiTest(TestCase):
+    """тест API элементов списка"""
+
+    def post_batch(self, list_, batch):
+        return self.client.post(
+            f'/api/lists/{list_.id}/items/', data=json.dumps(batch), content_type='application/json'
+        )
+
+    @patch('lists.api.API_PAGE_SIZE', 2)
+    def test_items_are_paginated_by_cursor(self):
+        """тест: элементы отдаются страницами по курсору"""
+
+        list_ = List.create_new('one')
+        Item.objects.create(list=list_, text='two')
+        Item.objects.create(list=list_, text='three')
+
+        first_page = self.client.get(f'/api/lists/{list_.id}/items/').json()
+        self.assertEqual([item['text'] for item in first_page['items']], ['one', 'two'])
+
+        second_page = self.client.get(f'/api/lists/{list_.id}/items/?after={first_page["next"]}').json()
+        self.assertEqual([item['text'] for item in second_page['items']], ['three'])
+        self.assertIsNone(second_page['next'])
+
+    def test_batch_adds_and_removes_items(self):
+        """тест: пакет добавляет и удаляет элементы"""
+
+        list_ = List.create_new('one')
+        two = Item.objects.create(list=list_, text='two')
+
+        data = self.post_batch(list_, {'add': ['three', 'four'], 'remove': [two.id]}).json()
+
+        self.assertEqual(data['added'], 2)
+        self.assertEqual(data['removed'], 1)
+        self.assertEqual([item.text for item in list_.item_set.all()], ['one', 'three', 'four'])
+
+    def test_only_owner_removes_items_of_owned_list(self):
+        """тест: удалять элементы списка с владельцем может только владелец"""
+
+        owner = User.objects.create(email='owner@mail.com')
+        list_ = List.create_new('one', owner=owner)
+        item_id = list_.item_set.get().id
+
+        response = self.post_batch(list_, {'remove': [item_id]})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(list_.item_set.count(), 1)
+
+        self.client.force_login(owner)
+        self.assertEqual(self.post_batch(list_, {'remove': [item_id]}).json()['removed'], 1)
+
+    def test_batch_reports_invalid_items_like_forms(self):
+        """тест: ошибки элементов такие же, как в формах"""
+
+        list_ = List.create_new('one')
+
+        data = self.post_batch(list_, {'add': ['one', '', 'two']}).json()
+
+        self.assertEqual(data['added'], 1)
+        self.assertEqual(data['errors'], [
+            {'index': 0, 'text': 'one', 'error': DUPLICATE_ITEM_ERROR},
+            {'index': 1, 'text': '', 'error': EMPTY_ITEM_ERROR},
+        ])
+
+    def test_batch_requires_json_content_type(self):
+        """тест: пакет принимается только в JSON"""
+
+        list_ = List.create_new('one')
+        response = self.client.post(f'/api/lists/{list_.id}/items/', data={'add': 'two'})
+        self.assertEqual(response.status_code, 415)
+
+    def test_boolean_item_ids_are_rejected(self):
+        """тест: true в remove не принимается за id элемента 1"""
+
+        list_ = List.create_new('one')
+        response = self.post_batch(list_, {'remove': [True]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list_.item_set.count(), 1)
+
+    def test_malformed_batch_is_rejected(self):
+        """тест: неправильный пакет отвергается"""
+
+        list_ = List.create_new('one')
+        response = self.post_batch(list_, {'add': 'two'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ListChangesApiTest(TestCase):
+    """тест API журнала изменений списка"""
+
+    def test_returns_changes_after_cursor(self):
+        """тест: отдаются изменения после курсора"""
+
+        list_ = List.create_new('milk')
+        cursor = self.client.get(f'/api/lists/{list_.id}/changes/').json()['next']
+        Item.objects.create(list=list_, text='eggs')
+
+        data = self.client.get(f'/api/lists/{list_.id}/changes/?since={cursor}').json()
+
+        self.assertEqual([(change['kind'], change['text']) for change in data['changes']], [('item_added', 'eggs')])
+        self.assertGreater(data['next'], cursor)
+        self.assertFalse(data['reset'])
+
+    def test_cursor_stays_when_nothing_changed(self):
+        """тест: без изменений курсор не меняется"""
+
+        list_ = List.create_new('milk')
+        cursor = self.client.get(f'/api/lists/{list_.id}/changes/').json()['next']
+
+        data = self.client.get(f'/api/lists/{list_.id}/changes/?since={cursor}').json()
+
+        self.assertEqual(data['changes'], [])
+        self.assertEqual(data['next'], cursor)
+
+    def test_sharee_addresses_are_shown_only_to_owner(self):
+        """тест: адреса получателей в журнале видит только владелец"""
+
+        owner = User.objects.create(email='owner@mail.com')
+        list_ = List.create_new('milk', owner=owner)
+        list_.shared_with.add(User.objects.create(email='friend@mail.com'))
+
+        changes = self.client.get(f'/api/lists/{list_.id}/changes/').json()['changes']
+        self.assertEqual([change['email'] for change in changes if change['kind'] == 'shared'], [''])
+
+        self.client.force_login(owner)
+        changes = self.client.get(f'/api/lists/{list_.id}/changes/').json()['changes']
+        self.assertEqual([change['email'] for change in changes if change['kind'] == 'shared'], ['friend@mail.com'])
+
+    def test_reset_when_cursor_is_older_than_compacted_log(self):
+        """тест: курсор старше сжатой части журнала требует полного перечитывания"""
+
+        list_ = List.create_new('milk')
+        Item.objects.create(list=list_, text='eggs')
+        Item.objects.create(list=list_, text='bread')
+        first = ListChange.objects.first()
+        compact_list_changes(older_than=timezone.now() + timedelta(days=1))
+
+        data = self.client.get(f'/api/lists/{list_.id}/changes/?since={first.id - 1}').json()
+
+        self.assertTrue(data['reset'])
+        self.assertEqual([change['text'] for change in data['changes']], ['bread'])
+
+
+class SyncApiTest(TestCase):
+    """тест пакетной синхронизации офлайн-операций"""
+
+    def post_operations(self, operations):
+        return self.client.post(
+            '/api/lists/sync', data=json.dumps({'operations': operations}), content_type='application/json'
+        )
+
+    def test_applies_operations_and_returns_results(self):
+        """тест: операции применяются, результаты возвращаются по каждой"""
+
+        list_ = List.create_new('milk')
+        results = self.post_operations([
+            {'key': 'k1', 'type': 'add_item', 'list': list_.id, 'text': 'eggs'},
+            {'key': 'k2', 'type': 'add_item', 'list': list_.id, 'text': 'milk'},
+            {'key': 'k3', 'type': 'new_list', 'ref': 'offline-list', 'text': 'bread'},
+            {'key': 'k4', 'type': 'add_item', 'list_ref': 'offline-list', 'text': 'butter'},
+        ]).json()['results']
+
+        self.assertEqual([result['status'] for result in results], ['ok', 'error', 'ok', 'ok'])
+        self.assertEqual(results[1]['error'], DUPLICATE_ITEM_ERROR)
+        new_list = List.objects.get(id=results[2]['list'])
+        self.assertEqual([item.text for item in new_list.item_set.all()], ['bread', 'butter'])
+
+    def test_replayed_operations_are_not_applied_twice(self):
+        """тест: повторно присланные операции не применяются второй раз"""
+
+        operations = [
+            {'key': 'k1', 'type': 'new_list', 'ref': 'r', 'text': 'bread'},
+            {'key': 'k2', 'type': 'add_item', 'list_ref': 'r', 'text': 'butter'},
+        ]
+        first = self.post_operations(operations).json()['results']
+        second = self.post_operations(operations).json()['results']
+
+        self.assertEqual(first, second)
+        self.assertEqual(List.objects.count(), 1)
+        self.assertEqual(Item.objects.count(), 2)
+
+    def test_reused_key_with_other_payload_is_an_error(self):
+        """тест: ключ с другим содержанием операции не возвращает чужой результат"""
+
+        list_ = List.create_new('milk')
+        self.post_operations([{'key': 'k1', 'type': 'add_item', 'list': list_.id, 'text': 'eggs'}])
+        results = self.post_operations([
+            {'key': 'k1', 'type': 'new_list', 'text': 'eggs'},
+            {'key': 'k2', 'type': 'new_list', 'text': 'bread'},
+            {'key': 'k2', 'type': 'new_list', 'text': 'butter'},
+        ]).json()['results']
+
+        self.assertEqual([result['status'] for result in results], ['error', 'ok', 'error'])
+        self.assertEqual(results[0]['error'], KEY_REUSED_ERROR)
+        self.assertEqual(List.objects.count(), 2)
+
+    def test_same_key_from_different_users_is_applied_for_each(self):
+        """тест: одинаковые ключи разных пользователей не смешиваются"""
+
+        operations = [{'key': 'k1', 'type': 'new_list', 'text': 'bread'}]
+        self.client.force_login(User.objects.create(email='first@mail.com'))
+        first = self.post_operations(operations).json()['results']
+        self.client.force_login(User.objects.create(email='second@mail.com'))
+        second = self.post_operations(operations).json()['results']
+
+        self.assertNotEqual(first[0]['list'], second[0]['list'])
+        self.assertEqual(List.objects.get(id=second[0]['list']).owner_id, 'second@mail.com')
+
+    def test_anonymous_keys_are_scoped_by_session(self):
+        """тест: ключи анонимов действуют только в их сессии"""
+
+        operations = [{'key': 'k1', 'type': 'new_list', 'text': 'bread'}]
+        self.post_operations(operations)
+        self.client.cookies.clear()
+        self.post_operations(operations)
+
+        self.assertEqual(List.objects.count(), 2)
+
+    def test_malformed_references_are_reported_per_operation(self):
+        """тест: ссылки неверного типа дают ошибку операции, а не ошибку сервера"""
+
+        list_ = List.create_new('milk')
+        results = self.post_operations([
+            {'key': 'k1', 'type': 'add_item', 'list': [list_.id], 'text': 'eggs'},
+            {'key': 'k2', 'type': 'new_list', 'ref': {}, 'text': 'bread'},
+            {'key': 'k3', 'type': 'add_item', 'list_ref': {}, 'text': 'butter'},
+            {'key': 'k4', 'type': 'add_item', 'list': True, 'text': 'eggs'},
+            {'key': 'k5', 'type': 'add_item', 'list': list_.id, 'text': 'eggs'},
+        ]).json()['results']
+
+        self.assertEqual([result['status'] for result in results], ['error'] * 4 + ['ok'])
+        self.assertEqual(results[0]['error'], INVALID_OPERATION_ERROR)
+        self.assertEqual(List.objects.count(), 1)
+
+    def test_operations_without_keys_are_rejected(self):
+        """тест: операции без ключей отвергаются"""
+
+        response = self.post_operations([{'type': 'new_list', 'text': 'bread'}])
+        self.assertEqual(response.status_code, 400)
+
+
+class SuggestApiTest(TestCase):
+    """тест API подсказок"""
+
+    def setUp(self):
+        suggest_indexes.clear()
+
+    def test_requires_login(self):
+        """тест: без входа подсказки не отдаются"""
+
+        response = self.client.get('/api/lists/suggest', data={'prefix': 'm'})
+        self.assertEqual(response.status_code, 401)
+
+    def test_returns_frequent_texts_of_user(self):
+        """тест: отдаются частые тексты элементов пользователя"""
+
+        user = User.objects.create(email='suggest@mail.com')
+        List.create_new('milk', owner=user)
+        List.create_new('milk', owner=user)
+        List.create_new('mint', owner=user)
+        self.client.force_login(user)
+
+        response = self.client.get('/api/lists/suggest', data={'prefix': 'MI'})
+
+        self.assertEqual(response.json(), {'suggestions': ['milk', 'mint']})
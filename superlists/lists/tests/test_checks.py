@@ -0,0 +1,28 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from lists.checks import check_sqlite_version
+
+
+class SqliteVersionCheckTest(SimpleTestCase):
+    """тест проверки версии SQLite"""
+
+    def test_current_sqlite_passes(self):
+        """тест: установленный SQLite подходит"""
+
+        self.assertEqual(check_sqlite_version(None), [])
+
+    @patch('lists.checks.sqlite3.sqlite_version_info', (3, 22, 0))
+    def test_old_sqlite_is_an_error(self):
+        """тест: SQLite старше 3.24 - ошибка проверки"""
+
+        errors = check_sqlite_version(None)
+        self.assertEqual([error.id for error in errors], ['lists.E001'])
+
+    @patch('lists.checks.sqlite3.sqlite_version_info', (3, 22, 0))
+    @override_settings(DATABASES={'default': {'ENGINE': 'django.db.backends.postgresql'}})
+    def test_other_databases_are_not_checked(self):
+        """тест: без SQLite версия не проверяется"""
+
+        self.assertEqual(check_sqlite_version(None), [])
@@ -0,0 +1,123 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from django.contrib.auth import get_user_model
+
+from lists.models import Item, List, ListChange, SyncOperation
+from lists.sync import SYNC_OPERATION_LIFETIME
+
+User = get_user_model()
+
+
+class CompactListChangesTest(TestCase):
+    """тест сжатия журнала изменений списков"""
+
+    def test_deletes_old_changes_in_batches_keeping_newest(self):
+        """тест: старые записи удаляются пачками, самая новая остается"""
+
+        old = timezone.now() - timedelta(days=40)
+        for i in range(5):
+            ListChange.objects.create(list_id=1, kind=ListChange.ITEM_ADDED, text=str(i), created_at=old)
+        fresh = ListChange.objects.create(list_id=1, kind=ListChange.ITEM_ADDED, text='fresh')
+
+        out = StringIO()
+        call_command('compact_list_changes', '--days=30', '--batch-size=2', stdout=out)
+
+        self.assertEqual(list(ListChange.objects.all()), [fresh])
+        self.assertIn('5', out.getvalue())
+
+    def test_keeps_newest_change_even_if_old(self):
+        """тест: самая новая запись не удаляется, даже если она старая"""
+
+        old = timezone.now() - timedelta(days=40)
+        ListChange.objects.create(list_id=1, kind=ListChange.ITEM_ADDED, created_at=old)
+        newest = ListChange.objects.create(list_id=1, kind=ListChange.ITEM_ADDED, created_at=old)
+
+        call_command('compact_list_changes', stdout=StringIO())
+
+        self.assertEqual(list(ListChange.objects.all()), [newest])
+
+
+class RebuildSearchIndexTest(TestCase):
+    """тест перестроения поискового индекса"""
+
+    @patch('lists.management.commands.rebuild_search_index.rebuild_search_index')
+    def test_rebuilds_index(self, mock_rebuild):
+        """тест: команда перестраивает индекс"""
+
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+
+        mock_rebuild.assert_called_once_with()
+        self.assertIn('перестроен', out.getvalue())
+
+
+class PurgeAnonymousListsTest(TestCase):
+    """тест удаления заброшенных анонимных списков"""
+
+    def abandoned(self, text, days=100, more=(), **kwargs):
+        list_ = List.create_new(text, **kwargs)
+        for item_text in more:
+            Item.objects.create(list=list_, text=item_text)
+        past = timezone.now() - timedelta(days=days)
+        List.objects.filter(id=list_.id).update(last_accessed=past, modified_at=past)
+        return list_
+
+    def test_deletes_abandoned_anonymous_lists_in_batches(self):
+        """тест: заброшенные анонимные списки удаляются пачками вместе с элементами"""
+
+        for i in range(3):
+            self.abandoned(f'old {i}', more=['more'])
+        fresh = List.create_new('fresh')
+        owned = self.abandoned('owned', owner=User.objects.create(email='user@mail.com'))
+        recent = self.abandoned('recent', days=10)
+
+        out = StringIO()
+        call_command('purge_anonymous_lists', '--days=90', '--batch-size=2', stdout=out)
+
+        self.assertEqual(set(List.objects.all()), {fresh, owned, recent})
+        self.assertEqual(Item.objects.count(), 3)
+        self.assertIn('3', out.getvalue())
+
+    def test_recently_accessed_list_is_kept(self):
+        """тест: список, который недавно открывали, не удаляется"""
+
+        list_ = self.abandoned('old')
+        List.objects.filter(id=list_.id).update(last_accessed=timezone.now())
+
+        call_command('purge_anonymous_lists', stdout=StringIO())
+
+        self.assertTrue(List.objects.filter(id=list_.id).exists())
+
+    @override_settings(ANONYMOUS_LIST_RETENTION_DAYS=200)
+    def test_retention_comes_from_settings(self):
+        """тест: срок хранения по умолчанию берется из настроек"""
+
+        self.abandoned('old')
+
+        call_command('purge_anonymous_lists', stdout=StringIO())
+
+        self.assertEqual(List.objects.count(), 1)
+
+
+class PurgeSyncOperationsTest(TestCase):
+    """тест удаления старых записей операций синхронизации"""
+
+    def test_deletes_expired_operations_in_batches(self):
+        """тест: записи старше срока хранения удаляются пачками"""
+
+        past = timezone.now() - SYNC_OPERATION_LIFETIME - timedelta(minutes=1)
+        for i in range(3):
+            SyncOperation.objects.create(scope='user:a@b.com', key=f'old {i}', result='{}', created_at=past)
+        fresh = SyncOperation.objects.create(scope='user:a@b.com', key='fresh', result='{}')
+
+        out = StringIO()
+        call_command('purge_sync_operations', '--batch-size=2', stdout=out)
+
+        self.assertEqual(list(SyncOperation.objects.all()), [fresh])
+        self.assertIn('3', out.getvalue())
@@ -0,0 +1,117 @@
+import json
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from lists.events import ListEventHub, event_stream, hub
+from lists.models import Item, List
+
+
+class ListEventHubTest(TestCase):
+    """тест издателя-подписчика событий списков"""
+
+    def test_subscriber_receives_events_of_its_list_only(self):
+        """тест: подписчик получает события только своего списка"""
+
+        events = ListEventHub()
+        subscription = events.subscribe(1)
+        events.publish(2, {'type': 'items'})
+        events.publish(1, {'type': 'items', 'items': []})
+
+        self.assertEqual(subscription.get_nowait(), {'type': 'items', 'items': []})
+        self.assertTrue(subscription.empty())
+
+    def test_unsubscribed_queue_gets_nothing(self):
+        """тест: после отписки события не приходят"""
+
+        events = ListEventHub()
+        subscription = events.subscribe(1)
+        events.unsubscribe(1, subscription)
+        events.publish(1, {'type': 'items'})
+
+        self.assertTrue(subscription.empty())
+
+    def test_subscribers_are_capped(self):
+        """тест: подписчиков не больше max_subscribers, отписка освобождает место"""
+
+        events = ListEventHub(max_subscribers=2)
+        first = events.subscribe(1)
+        events.subscribe(2)
+
+        self.assertIsNone(events.subscribe(3))
+        events.unsubscribe(1, first)
+        events.unsubscribe(1, first)
+        self.assertIsNotNone(events.subscribe(3))
+        self.assertIsNone(events.subscribe(4))
+
+    @patch('lists.events.SUBSCRIBER_QUEUE_SIZE', 1)
+    def test_slow_subscriber_does_not_block_publisher(self):
+        """тест: переполненная очередь подписчика не блокирует издателя"""
+
+        events = ListEventHub()
+        subscription = events.subscribe(1)
+        events.publish(1, {'type': 'items', 'n': 1})
+        events.publish(1, {'type': 'items', 'n': 2})
+
+        self.assertEqual(subscription.get_nowait()['n'], 1)
+
+
+class EventStreamTest(TestCase):
+    """тест потока server-sent events"""
+
+    def test_stream_sends_published_items_and_unsubscribes(self):
+        """тест: поток отдает опубликованные элементы и отписывается при закрытии"""
+
+        stream = event_stream(42, keepalive=0.01, duration=1)
+        self.assertEqual(next(stream), 'retry: 3000\n\n')
+        self.assertEqual(next(stream), ': keepalive\n\n')
+
+        hub.publish(42, {'type': 'items', 'items': [{'id': 1, 'text': 'milk'}]})
+        message = next(stream)
+        self.assertTrue(message.startswith('event: items\ndata: '))
+        self.assertEqual(json.loads(message.split('data: ')[1])['items'][0]['text'], 'milk')
+
+        stream.close()
+        self.assertNotIn(42, hub._subscribers)
+
+    def test_closing_unread_stream_unsubscribes(self):
+        """тест: закрытие так и не прочитанного потока освобождает место"""
+
+        stream = event_stream(43)
+        stream.close()
+        self.assertNotIn(43, hub._subscribers)
+
+    @patch('lists.receivers.transaction.on_commit', lambda callback: callback())
+    def test_new_item_is_published(self):
+        """тест: новый элемент публикуется подписчикам списка"""
+
+        list_ = List.objects.create()
+        subscription = hub.subscribe(list_.id)
+        try:
+            item = Item.objects.create(list=list_, text='milk')
+            self.assertEqual(
+                subscription.get_nowait(),
+                {'type': 'items', 'items': [{'id': item.id, 'text': 'milk'}]}
+            )
+        finally:
+            hub.unsubscribe(list_.id, subscription)
+
+    def test_events_view_streams_event_source(self):
+        """тест: представление отдает поток text/event-stream"""
+
+        list_ = List.objects.create()
+        response = self.client.get(f'/lists/{list_.id}/events')
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(next(iter(response.streaming_content)), b'retry: 3000\n\n')
+        response.close()
+
+    def test_events_view_is_unavailable_when_full(self):
+        """тест: когда места для потоков заняты, отдается 503 с Retry-After"""
+
+        list_ = List.objects.create()
+        with patch.object(hub, 'max_subscribers', 0):
+            response = self.client.get(f'/lists/{list_.id}/events')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '60')
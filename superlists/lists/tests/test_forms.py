@@ -1,9 +1,11 @@
 import unittest
 from unittest.mock import Mock, patch
 
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
-from lists.forms import ItemForm, ExistingListItemForm, EMPTY_ITEM_ERROR, DUPLICATE_ITEM_ERROR, NewListForm
-from lists.models import List, Item
+from lists.forms import ItemForm, ExistingListItemForm, EMPTY_ITEM_ERROR, DUPLICATE_ITEM_ERROR, NewListForm, \
+    ItemImportForm, EMPTY_IMPORT_ERROR, ENCODING_IMPORT_ERROR, LineError, import_items
+from lists.models import Item, List
 
 
 class ItemFormTest(TestCase):
@@ -60,6 +62,17 @@ class ExistingListItemFormTest(TestCase):
             [DUPLICATE_ITEM_ERROR]
         )
 
+    def test_form_save_reports_duplicate_added_concurrently(self):
+        """тест: save сообщает о дубликате, добавленном после валидации"""
+
+        list_ = List.objects.create()
+        form = ExistingListItemForm(for_list=list_, data={'text': 'гонка'})
+        self.assertTrue(form.is_valid())
+        Item.objects.create(list=list_, text='гонка')
+
+        self.assertIsNone(form.save())
+        self.assertEqual(form.errors['text'], [DUPLICATE_ITEM_ERROR])
+
     def test_form_save(self):
         """тест сохранения формы"""
 
@@ -112,3 +125,92 @@ class NewListFormTest(unittest.TestCase):
         form.is_valid()
         response = form.save(owner=user)
         self.assertEqual(response, mock_List_create_new.return_value)
+
+
+class ItemImportFormTest(TestCase):
+    """тест формы массового импорта элементов"""
+
+    def test_validation_requires_text_or_file(self):
+        """тест: нужен текст или файл"""
+
+        form = ItemImportForm(data={'text': ''})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.non_field_errors(), [EMPTY_IMPORT_ERROR])
+
+    def test_save_adds_pasted_lines(self):
+        """тест: save добавляет вставленные строки"""
+
+        list_ = List.create_new('first')
+        form = ItemImportForm(data={'text': 'second\nthird\n'})
+        form.is_valid()
+        report = form.save(for_list=list_)
+        self.assertEqual(report.created, 2)
+        self.assertEqual([item.text for item in list_.item_set.all()], ['first', 'second', 'third'])
+
+    def test_save_takes_first_column_of_csv_file(self):
+        """тест: из CSV-файла берется первая колонка"""
+
+        list_ = List.objects.create()
+        upload = SimpleUploadedFile('items.csv', '"milk, 2l",shop\neggs,market\n'.encode())
+        form = ItemImportForm(data={}, files={'file': upload})
+        form.is_valid()
+        form.save(for_list=list_)
+        self.assertEqual([item.text for item in list_.item_set.all()], ['milk, 2l', 'eggs'])
+        self.assertEqual(List.objects.get(id=list_.id).name, 'milk, 2l')
+
+
+    def test_file_in_other_encoding_is_a_form_error(self):
+        """тест: файл не в UTF-8 дает ошибку формы с номером строки"""
+
+        upload = SimpleUploadedFile('items.txt', 'milk\nмолоко\n'.encode('cp1251'))
+        form = ItemImportForm(data={}, files={'file': upload})
+
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors['file'], [ENCODING_IMPORT_ERROR.format(line=2)])
+
+
+class ImportItemsTest(TestCase):
+    """тест массового добавления элементов"""
+
+    @patch('lists.forms.IMPORT_CHUNK_SIZE', 2)
+    def test_reports_empty_and_duplicate_lines(self):
+        """тест: пустые строки и дубликаты попадают в отчет с номерами строк"""
+
+        list_ = List.create_new('old')
+        report = import_items(list_, ['new', '', 'old', 'other', 'new'])
+
+        self.assertEqual(report.created, 2)
+        self.assertEqual(report.errors, [
+            LineError(2, '', EMPTY_ITEM_ERROR),
+            LineError(3, 'old', DUPLICATE_ITEM_ERROR),
+            LineError(5, 'new', DUPLICATE_ITEM_ERROR),
+        ])
+        self.assertEqual(list_.item_set.count(), 3)
+
+    def test_text_added_concurrently_is_reported_as_duplicate(self):
+        """тест: текст, добавленный параллельно после проверки, дает ошибку строки, а не IntegrityError"""
+
+        list_ = List.create_new('old')
+        touch = List.touch
+
+        def racing_touch(for_list, **fields):
+            # параллельный запрос успел зафиксировать тот же текст до начала транзакции импорта
+            with patch.object(List, 'touch', touch):
+                Item.objects.create(list=for_list, text='eggs')
+            return touch(for_list, **fields)
+
+        with patch.object(List, 'touch', racing_touch):
+            report = import_items(list_, ['eggs', 'bread'])
+
+        self.assertEqual(report.created, 1)
+        self.assertEqual(report.errors, [LineError(1, 'eggs', DUPLICATE_ITEM_ERROR)])
+        self.assertEqual([item.text for item in list_.item_set.all()], ['old', 'eggs', 'bread'])
+
+    @patch('lists.forms.IMPORT_CHUNK_SIZE', 2)
+    def test_checks_duplicates_with_one_query_per_chunk(self):
+        """тест: дубликаты проверяются одним запросом на пачку"""
+
+        list_ = List.create_new('old')
+        Item.objects.create(list=list_, text='older')
+        with self.assertNumQueries(2):
+            import_items(list_, ['old', '', 'older', '', ''])
@@ -1,9 +1,13 @@
+from datetime import timedelta
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.db import IntegrityError
 from django.test import TestCase
+from django.utils import timezone
 
-from lists.models import Item, List
+from lists.models import Item, List, ListChange, text_hash
 
 User = get_user_model()
 
@@ -56,6 +60,64 @@ class ListModelTest(TestCase):
         Item.objects.create(list=list_, text='second item')
         self.assertEqual(list_.name, 'first item')
 
+    def test_list_name_is_stored_in_db(self):
+        """тест: имя списка хранится в базе данных"""
+
+        list_ = List.create_new(first_item_text='new item text')
+        Item.objects.create(list=list_, text='second item')
+        self.assertEqual(List.objects.get(id=list_.id).name, 'new item text')
+
+    def test_list_name_follows_first_item_text_change(self):
+        """тест: имя списка меняется вместе с текстом первого элемента"""
+
+        list_ = List.create_new(first_item_text='old text')
+        item = list_.item_set.first()
+        item.text = 'new text'
+        item.save()
+        self.assertEqual(List.objects.get(id=list_.id).name, 'new text')
+
+    def test_list_name_moves_to_next_item_when_first_deleted(self):
+        """тест: при удалении первого элемента имя берется из следующего"""
+
+        list_ = List.create_new(first_item_text='first item')
+        Item.objects.create(list=list_, text='second item')
+        list_.item_set.first().delete()
+        self.assertEqual(List.objects.get(id=list_.id).name, 'second item')
+
+    def test_adding_item_updates_modified_at(self):
+        """тест: добавление элемента обновляет время изменения списка"""
+
+        list_ = List.create_new(first_item_text='first item')
+        before = List.objects.get(id=list_.id).modified_at
+        Item.objects.create(list=list_, text='second item')
+        self.assertGreater(List.objects.get(id=list_.id).modified_at, before)
+
+    def test_mark_accessed_writes_at_most_once_per_interval(self):
+        """тест: время обращения пишется в БД не чаще раза за интервал"""
+
+        list_ = List.objects.create()
+        cache.delete(f'list-accessed:{list_.id}')
+        List.objects.filter(id=list_.id).update(last_accessed=timezone.now() - timedelta(days=5))
+
+        with self.assertNumQueries(1):
+            List.mark_accessed(list_.id)
+        with self.assertNumQueries(0):
+            List.mark_accessed(list_.id)
+        self.assertGreater(List.objects.get(id=list_.id).last_accessed, timezone.now() - timedelta(days=1))
+
+    def test_summaries_count_items_of_each_list(self):
+        """тест: сводка считает элементы каждого списка"""
+
+        list1 = List.create_new(first_item_text='one')
+        Item.objects.create(list=list1, text='two')
+        list2 = List.objects.create()
+
+        summaries = {row['id']: row for row in List.objects.summaries()}
+
+        self.assertEqual(summaries[list1.id]['name'], 'one')
+        self.assertEqual(summaries[list1.id]['item_count'], 2)
+        self.assertEqual(summaries[list2.id]['item_count'], 0)
+
     def test_add_email_to_shared_with_user(self):
         """test: добавление пользователя в список поделиться с пользователем"""
 
@@ -133,3 +195,211 @@ class ItemModelTest(TestCase):
         list1 = List.objects.create()
         item1 = Item.objects.create(list=list1, text='new item 1')
         self.assertEqual(str(item1), 'new item 1')
+
+    def test_save_stores_text_hash(self):
+        """test: при сохранении запоминается хэш текста"""
+
+        list1 = List.objects.create()
+        item = Item.objects.create(list=list1, text='new item')
+        self.assertEqual(Item.objects.get(id=item.id).text_hash, text_hash('new item'))
+
+    def test_insert_unique_adds_item(self):
+        """test: insert_unique добавляет элемент в список"""
+
+        list1 = List.objects.create()
+        item = Item.objects.insert_unique(list1, 'new item')
+        self.assertEqual(Item.objects.get(), item)
+        self.assertEqual(List.objects.get(id=list1.id).name, 'new item')
+
+    def test_insert_unique_skips_duplicate_in_one_query(self):
+        """test: insert_unique пропускает дубликат одним запросом"""
+
+        list1 = List.objects.create()
+        Item.objects.create(list=list1, text='new item')
+        with self.assertNumQueries(1):
+            item = Item.objects.insert_unique(list1, 'new item')
+        self.assertIsNone(item)
+        self.assertEqual(Item.objects.count(), 1)
+
+    def test_insert_many_skips_duplicates_in_batches(self):
+        """test: insert_many пропускает имеющиеся тексты, по запросу на пачку"""
+
+        list1 = List.objects.create()
+        Item.objects.create(list=list1, text='b')
+        with self.assertNumQueries(3):
+            inserted = Item.objects.insert_many(list1, ['a', 'b', 'c', 'd', 'e'], batch_size=2)
+        self.assertEqual(inserted, 4)
+        self.assertEqual([item.text for item in list1.item_set.all()], ['b', 'a', 'c', 'd', 'e'])
+
+
+class CloneMergeTest(TestCase):
+    """тест копирования и слияния списков"""
+
+    def texts(self, list_):
+        return list(Item.objects.filter(list=list_).values_list('text', flat=True))
+
+    def test_clone_copies_items_in_order(self):
+        """тест: копия списка содержит те же элементы в том же порядке"""
+
+        owner = User.objects.create(email='a@b.com')
+        source = List.create_new('milk')
+        Item.objects.create(list=source, text='eggs')
+
+        copy = source.clone(owner=owner)
+
+        self.assertNotEqual(copy.id, source.id)
+        self.assertEqual(copy.owner, owner)
+        self.assertEqual(List.objects.get(id=copy.id).name, 'milk')
+        self.assertEqual(self.texts(copy), ['milk', 'eggs'])
+        self.assertEqual(self.texts(source), ['milk', 'eggs'])
+
+    def test_merge_skips_texts_already_in_target(self):
+        """тест: слияние пропускает тексты, которые в списке уже есть"""
+
+        source = List.create_new('milk')
+        Item.objects.create(list=source, text='eggs')
+        Item.objects.create(list=source, text='bread')
+        target = List.create_new('eggs')
+
+        count = target.merge(source)
+
+        self.assertEqual(count, 2)
+        self.assertEqual(self.texts(target), ['eggs', 'milk', 'bread'])
+
+    def test_merge_copies_items_with_one_insert(self):
+        """тест: элементы копируются одним запросом независимо от их количества"""
+
+        source = List.objects.create()
+        Item.objects.bulk_create(
+            Item(list=source, text=f'item {i}', text_hash=text_hash(f'item {i}')) for i in range(300)
+        )
+        target = List.create_new('item 0')
+
+        with self.assertNumQueries(6):
+            # точка сохранения, max(id), INSERT ... SELECT, время изменения,
+            # журнал одним INSERT ... SELECT, фиксация точки сохранения
+            count = target.merge(source)
+
+        self.assertEqual(count, 299)
+        self.assertEqual(Item.objects.filter(list=target).count(), 300)
+
+    def test_merge_into_empty_list_sets_name(self):
+        """тест: слияние в пустой список задает ему имя"""
+
+        source = List.create_new('milk')
+        target = List.objects.create()
+        target.merge(source)
+        self.assertEqual(List.objects.get(id=target.id).name, 'milk')
+
+    def test_merge_records_added_items(self):
+        """тест: скопированные элементы попадают в журнал изменений"""
+
+        source = List.create_new('milk')
+        Item.objects.create(list=source, text='eggs')
+        target = List.create_new('eggs')
+        target.merge(source)
+
+        changes = ListChange.objects.filter(list_id=target.id).values_list('kind', 'item_id', 'text')
+        milk = Item.objects.get(list=target, text='milk')
+        self.assertEqual(list(changes)[-1], (ListChange.ITEM_ADDED, milk.id, 'milk'))
+        self.assertEqual(len(changes), 2)
+
+
+class FastDeleteTest(TestCase):
+    """тест прямого удаления списков и элементов"""
+
+    def test_delete_fast_removes_list_with_items_and_shares(self):
+        """тест: список удаляется вместе с элементами, связями и журналом"""
+
+        friend = User.objects.create(email='friend@mail.com')
+        list_ = List.create_new('milk')
+        Item.objects.create(list=list_, text='eggs')
+        list_.shared_with.add(friend)
+        other = List.create_new('bread')
+
+        list_.delete_fast(batch_size=1)
+
+        self.assertFalse(List.objects.filter(id=list_.id).exists())
+        self.assertEqual(list(Item.objects.values_list('text', flat=True)), ['bread'])
+        self.assertFalse(friend.available_lists.exists())
+        self.assertFalse(ListChange.objects.filter(list_id=list_.id).exists())
+        self.assertTrue(ListChange.objects.filter(list_id=other.id).exists())
+
+    def test_delete_fast_does_not_load_items(self):
+        """тест: количество запросов зависит от числа пачек, а не от числа элементов"""
+
+        list_ = List.objects.create()
+        Item.objects.bulk_create(
+            Item(list=list_, text=f'item {i}', text_hash=text_hash(f'item {i}')) for i in range(10)
+        )
+
+        with self.assertNumQueries(3 * 5 + 1):
+            # три пачки элементов, по одной связей и журнала, каждая со своей
+            # точкой сохранения, и сам список
+            list_.delete_fast(batch_size=5)
+
+        self.assertEqual(Item.objects.count(), 0)
+
+    def test_delete_many_removes_only_items_of_list(self):
+        """тест: массовое удаление не трогает элементы других списков"""
+
+        list_ = List.create_new('milk')
+        eggs = Item.objects.create(list=list_, text='eggs')
+        other = List.create_new('bread')
+
+        deleted = Item.objects.delete_many(list_, [list_.item_set.first().id, other.item_set.get().id])
+
+        self.assertEqual(deleted, 1)
+        self.assertEqual(list(list_.item_set.all()), [eggs])
+        self.assertEqual(List.objects.get(id=list_.id).name, 'eggs')
+        self.assertEqual(other.item_set.count(), 1)
+
+    def test_delete_many_records_removed_items(self):
+        """тест: массовое удаление попадает в журнал изменений"""
+
+        list_ = List.create_new('milk')
+        ids = [list_.item_set.get().id, Item.objects.create(list=list_, text='eggs').id]
+
+        Item.objects.delete_many(list_, ids, batch_size=1)
+
+        removed = ListChange.objects.filter(list_id=list_.id, kind=ListChange.ITEM_REMOVED)
+        self.assertEqual(list(removed.values_list('item_id', flat=True)), ids)
+
+
+class ListChangeTest(TestCase):
+    """тест журнала изменений списка"""
+
+    def changes(self, list_):
+        return list(ListChange.objects.filter(list_id=list_.id).values_list('kind', 'text', 'email'))
+
+    def test_item_add_and_delete_are_recorded(self):
+        """тест: добавление и удаление элементов попадают в журнал"""
+
+        list_ = List.create_new('milk')
+        item = Item.objects.create(list=list_, text='eggs')
+        item_id = item.id
+        item.delete()
+
+        self.assertEqual(self.changes(list_), [
+            (ListChange.ITEM_ADDED, 'milk', ''),
+            (ListChange.ITEM_ADDED, 'eggs', ''),
+            (ListChange.ITEM_REMOVED, '', ''),
+        ])
+        self.assertEqual(ListChange.objects.last().item_id, item_id)
+
+    def test_share_changes_are_recorded_from_both_sides(self):
+        """тест: изменения доступа с обеих сторон связи попадают в журнал"""
+
+        friend = User.objects.create(email='friend@mail.com')
+        list_ = List.objects.create()
+        list_.shared_with.add(friend)
+        friend.available_lists.remove(list_)
+        friend.available_lists.add(list_)
+        list_.shared_with.clear()
+
+        self.assertEqual(self.changes(list_), [
+            (ListChange.SHARED, '', 'friend@mail.com'),
+            (ListChange.UNSHARED, '', 'friend@mail.com'),
+            (ListChange.SHARED, '', 'friend@mail.com'),
+            (ListChange.UNSHARED, '', 'friend@mail.com'),
+        ])
@@ -0,0 +1,92 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+
+from lists.models import Item, List
+from lists.search import match_query, rebuild_search_index, search_items
+
+User = get_user_model()
+
+
+class SearchItemsTest(TestCase):
+    """тест полнотекстового поиска элементов"""
+
+    def setUp(self):
+        self.user = User.objects.create(email='user@mail.com')
+
+    def texts(self, query):
+        return [item.text for item in search_items(self.user.email, query)]
+
+    def test_finds_items_of_owned_and_shared_lists_only(self):
+        """тест: находятся элементы только своих и доступных списков"""
+
+        List.create_new('buy milk', owner=self.user)
+        List.create_new('milk for cat').shared_with.add(self.user)
+        List.create_new('milk for dog')
+
+        self.assertEqual(sorted(self.texts('milk')), ['buy milk', 'milk for cat'])
+
+    def test_results_have_list_name(self):
+        """тест: у найденного элемента есть имя его списка"""
+
+        list_ = List.create_new('groceries', owner=self.user)
+        Item.objects.create(list=list_, text='milk')
+
+        [item] = search_items(self.user.email, 'milk')
+
+        self.assertEqual(item.list_id, list_.id)
+        self.assertEqual(item.list_name, 'groceries')
+
+    def test_index_follows_item_changes(self):
+        """тест: индекс обновляется при изменении и удалении элементов"""
+
+        list_ = List.create_new('milk', owner=self.user)
+        item = Item.objects.create(list=list_, text='bread')
+        item.text = 'butter'
+        item.save()
+        list_.item_set.get(text='milk').delete()
+
+        self.assertEqual(self.texts('bread'), [])
+        self.assertEqual(self.texts('milk'), [])
+        self.assertEqual(self.texts('butter'), ['butter'])
+
+    def test_more_relevant_items_first(self):
+        """тест: более подходящие элементы идут первыми"""
+
+        list_ = List.create_new('milk and a very long description of some groceries', owner=self.user)
+        Item.objects.create(list=list_, text='milk milk')
+
+        self.assertEqual(self.texts('milk')[0], 'milk milk')
+
+    def test_all_words_are_required(self):
+        """тест: элемент должен содержать все слова запроса"""
+
+        list_ = List.create_new('buy milk', owner=self.user)
+        Item.objects.create(list=list_, text='buy bread')
+
+        self.assertEqual(self.texts('buy milk'), ['buy milk'])
+
+    def test_query_operators_are_searched_as_words(self):
+        """тест: операторы FTS5 в запросе ищутся как обычные слова"""
+
+        List.create_new('milk', owner=self.user)
+
+        self.assertEqual(self.texts('milk OR "'), [])
+        self.assertEqual(self.texts('milk* -'), ['milk'])
+
+    def test_match_query_quotes_words(self):
+        """тест: каждое слово запроса берется в кавычки"""
+
+        self.assertEqual(match_query(' say "hi" '), '"say" """hi"""')
+
+    def test_rebuild_restores_index(self):
+        """тест: перестроение восстанавливает индекс"""
+
+        List.create_new('milk', owner=self.user)
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO lists_item_fts (lists_item_fts) VALUES ('delete-all')")
+        self.assertEqual(self.texts('milk'), [])
+
+        rebuild_search_index()
+
+        self.assertEqual(self.texts('milk'), ['milk'])
@@ -0,0 +1,99 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from lists.models import Item, List
+from lists.suggest import PrefixIndex, SuggestIndexes, indexes
+
+User = get_user_model()
+
+
+class PrefixIndexTest(TestCase):
+    """тест префиксного индекса текстов"""
+
+    def test_suggests_most_frequent_texts_with_prefix(self):
+        """тест: подсказываются самые частые тексты с данным началом"""
+
+        index = PrefixIndex({'milk': 3, 'Millet': 5, 'mint': 1, 'eggs': 9})
+        self.assertEqual(index.suggest('MI', limit=2), ['Millet', 'milk'])
+        self.assertEqual(index.suggest('mil'), ['Millet', 'milk'])
+        self.assertEqual(index.suggest('x'), [])
+        self.assertEqual(index.suggest(''), [])
+
+    def test_add_updates_counts_and_keys(self):
+        """тест: добавление учитывает новые и повторные тексты"""
+
+        index = PrefixIndex({'milk': 1, 'mint': 1})
+        index.add('mint')
+        index.add('mild cheese')
+        self.assertEqual(index.suggest('mi'), ['mint', 'milk', 'mild cheese'])
+
+
+class SuggestIndexesTest(TestCase):
+    """тест индексов подсказок пользователей"""
+
+    def setUp(self):
+        self.user = User.objects.create(email='user@mail.com')
+
+    def test_index_is_built_once_from_owned_lists(self):
+        """тест: индекс строится один раз по спискам пользователя"""
+
+        indexes = SuggestIndexes()
+        list_ = List.create_new('milk', owner=self.user)
+        Item.objects.create(list=list_, text='mint')
+        List.create_new('mild cheese')
+
+        with self.assertNumQueries(2):
+            self.assertEqual(indexes.suggest(self.user.email, 'mi'), ['mint', 'milk'])
+        with self.assertNumQueries(0):
+            self.assertEqual(indexes.suggest(self.user.email, 'mil'), ['milk'])
+
+    def test_least_recently_used_index_is_evicted(self):
+        """тест: вытесняется индекс, к которому дольше всего не обращались"""
+
+        indexes = SuggestIndexes(max_users=2)
+        for email in ('a@mail.com', 'b@mail.com', 'a@mail.com', 'c@mail.com'):
+            indexes.suggest(email, 'm')
+
+        with self.assertNumQueries(0):
+            indexes.suggest('a@mail.com', 'm')
+        with self.assertNumQueries(2):
+            indexes.suggest('b@mail.com', 'm')
+
+    def test_new_items_of_owned_lists_update_index(self):
+        """тест: новые элементы своих списков сразу попадают в подсказки"""
+
+        indexes.clear()
+        indexes.suggest(self.user.email, 'm')
+        list_ = List.create_new('milk', owner=self.user)
+        Item.objects.insert_unique(list_, 'mint')
+        Item.objects.create(list=List.create_new('mild cheese'), text='mild')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(indexes.suggest(self.user.email, 'mi'), ['mint', 'milk'])
+
+    def test_copied_items_rebuild_index(self):
+        """тест: после копирования набора элементов индекс строится заново"""
+
+        indexes.clear()
+        source = List.create_new('milk')
+        indexes.suggest(self.user.email, 'm')
+
+        source.clone(owner=self.user)
+
+        with self.assertNumQueries(2):
+            self.assertEqual(indexes.suggest(self.user.email, 'm'), ['milk'])
+
+    def test_deleted_items_and_lists_rebuild_index(self):
+        """тест: после удаления элементов и списков удаленные тексты не подсказываются"""
+
+        indexes.clear()
+        list_ = List.create_new('milk', owner=self.user)
+        mint = Item.objects.create(list=list_, text='mint')
+        other = List.create_new('millet', owner=self.user)
+        self.assertEqual(indexes.suggest(self.user.email, 'mi'), ['mint', 'millet', 'milk'])
+
+        Item.objects.delete_many(list_, [mint.id])
+        self.assertEqual(indexes.suggest(self.user.email, 'mi'), ['millet', 'milk'])
+
+        other.delete_fast()
+        self.assertEqual(indexes.suggest(self.user.email, 'mi'), ['milk'])
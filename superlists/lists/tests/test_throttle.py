@@ -0,0 +1,76 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from lists.models import List
+from superlists.throttle import THROTTLE_CACHE
+
+User = get_user_model()
+
+
+@override_settings(THROTTLE_RATES={
+    'new_list': {'ip': (2, 60), 'user': (1, 60)},
+    'share_list': {'ip': (1, 60)},
+})
+class ThrottleTest(TestCase):
+    """тест ограничения частоты запросов"""
+
+    def setUp(self):
+        # корзины с маленькими лимитами не должны достаться другим тестам
+        caches[THROTTLE_CACHE].clear()
+        self.addCleanup(caches[THROTTLE_CACHE].clear)
+
+    def post_new_list(self, ip='10.0.0.1'):
+        return self.client.post('/lists/new', data={'text': 'item'}, HTTP_X_REAL_IP=ip)
+
+    def test_rejects_requests_over_limit_with_retry_after(self):
+        """тест: запросы сверх лимита отклоняются с 429 и Retry-After"""
+
+        self.assertEqual(self.post_new_list().status_code, 302)
+        self.assertEqual(self.post_new_list().status_code, 302)
+
+        response = self.post_new_list()
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertEqual(List.objects.count(), 2)
+
+    def test_other_clients_are_not_affected(self):
+        """тест: лимит одного клиента не мешает другим"""
+
+        for _ in range(3):
+            self.post_new_list()
+        self.assertEqual(self.post_new_list(ip='10.0.0.2').status_code, 302)
+
+    def test_bucket_refills_over_time(self):
+        """тест: корзина наполняется со временем"""
+
+        with patch('superlists.throttle.time.time', return_value=1000):
+            self.post_new_list()
+            self.post_new_list()
+            self.assertEqual(self.post_new_list().status_code, 429)
+        with patch('superlists.throttle.time.time', return_value=1030):
+            self.assertEqual(self.post_new_list().status_code, 302)
+            self.assertEqual(self.post_new_list().status_code, 429)
+
+    def test_logged_in_user_has_own_bucket(self):
+        """тест: вошедший пользователь ограничен и с разных адресов"""
+
+        self.client.force_login(User.objects.create(email='user@mail.com'))
+
+        self.assertEqual(self.post_new_list(ip='10.0.0.1').status_code, 302)
+        self.assertEqual(self.post_new_list(ip='10.0.0.2').status_code, 429)
+
+    def test_rejection_makes_no_queries(self):
+        """тест: отклоненный запрос не обращается к БД"""
+
+        list_ = List.create_new('milk')
+        self.client.post(f'/lists/{list_.id}/share', data={'sharee': 'a@mail.com'}, HTTP_X_REAL_IP='10.0.0.1')
+
+        with self.assertNumQueries(0):
+            response = self.client.post(
+                f'/lists/{list_.id}/share', data={'sharee': 'a@mail.com'}, HTTP_X_REAL_IP='10.0.0.1'
+            )
+        self.assertEqual(response.status_code, 429)
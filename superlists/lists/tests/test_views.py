@@ -1,14 +1,23 @@
+import json
 import unittest
+from datetime import timedelta
 from unittest import skip
 from unittest.mock import patch, Mock
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.http import HttpRequest
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from django.utils.html import escape
+from django.utils.http import http_date
 
-from lists.forms import ItemForm, EMPTY_ITEM_ERROR, DUPLICATE_ITEM_ERROR, ExistingListItemForm
-from lists.models import Item, List
+from lists.forms import ItemForm, EMPTY_ITEM_ERROR, DUPLICATE_ITEM_ERROR, ENCODING_IMPORT_ERROR, ExistingListItemForm
+from lists.models import Item, List, ListChange
+from lists.sync import KEY_REUSED_ERROR
 from lists.views import new_list
 
 User = get_user_model()
@@ -28,6 +37,14 @@ class HomePageTest(TestCase):
         response = self.client.get('/')
         self.assertIsInstance(response.context['form'], ItemForm)
 
+    def test_suggestions_only_for_logged_in_users(self):
+        """тест: адрес подсказок выводится в форму только вошедшему пользователю"""
+
+        self.assertNotContains(self.client.get('/'), 'data-suggest-url')
+
+        self.client.force_login(User.objects.create(email='user@mail.com'))
+        self.assertContains(self.client.get('/'), 'data-suggest-url="/api/lists/suggest"')
+
 
 class ListViewTest(TestCase):
     """тест: представление списка"""
@@ -60,6 +77,87 @@ class ListViewTest(TestCase):
         self.assertNotContains(response, 'other list itemey 1')
         self.assertNotContains(response, 'other list itemey 2')
 
+    @patch('lists.views.ITEMS_PAGE_SIZE', 2)
+    def test_renders_only_first_page_of_items(self):
+        """тест: отображается только первая страница элементов"""
+
+        list_ = List.create_new('itemey 1')
+        Item.objects.create(text='itemey 2', list=list_)
+        Item.objects.create(text='itemey 3', list=list_)
+
+        response = self.client.get(f'/lists/{list_.id}/')
+
+        self.assertContains(response, '2: itemey 2')
+        self.assertNotContains(response, 'itemey 3')
+        second = Item.objects.get(text='itemey 2')
+        self.assertContains(response, f'data-next-url="/lists/{list_.id}/?after={second.id}&amp;start=2"')
+
+    @patch('lists.views.ITEMS_PAGE_SIZE', 2)
+    def test_cursor_returns_next_page_fragment(self):
+        """тест: по курсору возвращается фрагмент со следующей страницей"""
+
+        list_ = List.create_new('itemey 1')
+        second = Item.objects.create(text='itemey 2', list=list_)
+        Item.objects.create(text='itemey 3', list=list_)
+        Item.objects.create(text='itemey 4', list=list_)
+        Item.objects.create(text='itemey 5', list=list_)
+
+        response = self.client.get(f'/lists/{list_.id}/?after={second.id}&start=2')
+
+        self.assertTemplateUsed(response, 'list_items.html')
+        self.assertTemplateNotUsed(response, 'list.html')
+        self.assertNotContains(response, 'itemey 2')
+        self.assertContains(response, '3: itemey 3')
+        self.assertContains(response, '4: itemey 4')
+        fourth = Item.objects.get(text='itemey 4')
+        self.assertEqual(response['X-Next-Page'], f'/lists/{list_.id}/?after={fourth.id}&start=4')
+
+    def test_last_page_fragment_has_no_next_page(self):
+        """тест: у последней страницы нет ссылки на следующую"""
+
+        list_ = List.create_new('itemey 1')
+        first = list_.item_set.first()
+        Item.objects.create(text='itemey 2', list=list_)
+
+        response = self.client.get(f'/lists/{list_.id}/?after={first.id}&start=1')
+
+        self.assertContains(response, '2: itemey 2')
+        self.assertFalse(response.has_header('X-Next-Page'))
+
+    @patch('lists.views.STREAM_CHUNK_SIZE', 2)
+    @patch('lists.views.ITEMS_PAGE_SIZE', 1)
+    def test_all_mode_streams_every_item(self):
+        """тест: в режиме all весь список отдается потоком"""
+
+        list_ = List.create_new('itemey 1')
+        for i in range(2, 6):
+            Item.objects.create(text=f'itemey {i}', list=list_)
+
+        response = self.client.get(f'/lists/{list_.id}/?all=1')
+
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode()
+        for i in range(1, 6):
+            self.assertIn(f'{i}: itemey {i}', content)
+        self.assertNotIn('data-next-url', content)
+        self.assertIn('</html>', content)
+
+    @patch('lists.views.STREAM_CHUNK_SIZE', 2)
+    def test_all_mode_reads_items_by_separate_chunk_queries(self):
+        """тест: поток читает элементы отдельными запросами по частям, не держа курсор БД"""
+
+        list_ = List.create_new('itemey 1')
+        for i in range(2, 6):
+            Item.objects.create(text=f'itemey {i}', list=list_)
+        response = self.client.get(f'/lists/{list_.id}/?all=1')
+        chunks = iter(response.streaming_content)
+        next(chunks)
+
+        with self.assertNumQueries(3):
+            rest = b''.join(chunks).decode()
+
+        self.assertIn('5: itemey 5', rest)
+
     def test_uses_list_template(self):
         """тест: используется шаблон списка"""
         list_ = List.objects.create()
@@ -166,6 +264,272 @@ class ListViewTest(TestCase):
         self.assertEqual(Item.objects.all().count(), 1)
 
 
+class AjaxAddItemTest(TestCase):
+    """тест асинхронного добавления элемента"""
+
+    def post_ajax(self, list_, data):
+        return self.client.post(f'/lists/{list_.id}/', data=data, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+    def test_returns_new_row_fragment(self):
+        """тест: возвращается строка таблицы с новым элементом"""
+
+        list_ = List.create_new('itemey 1')
+        response = self.post_ajax(list_, {'text': 'itemey 2', 'position': 1})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertTemplateUsed(response, 'list_items.html')
+        self.assertTemplateNotUsed(response, 'list.html')
+        self.assertContains(response, '2: itemey 2', status_code=201)
+        self.assertEqual(list_.item_set.count(), 2)
+
+    def test_returns_error_fragment_for_invalid_item(self):
+        """тест: для недопустимого элемента возвращается фрагмент с ошибкой"""
+
+        list_ = List.create_new('itemey 1')
+        response = self.post_ajax(list_, {'text': 'itemey 1', 'position': 1})
+
+        self.assertTemplateUsed(response, 'item_form_errors.html')
+        self.assertContains(response, escape(DUPLICATE_ITEM_ERROR), status_code=400)
+
+    def test_number_of_queries_does_not_depend_on_list_size(self):
+        """тест: количество запросов не зависит от размера списка"""
+
+        list_ = List.create_new('itemey 1')
+        # отметка обращения пишется раз в сутки и зависит от кэша других тестов
+        List.mark_accessed(list_.id)
+        with self.assertNumQueries(5):
+            self.post_ajax(list_, {'text': 'itemey 2', 'position': 1})
+
+        for i in range(3, 20):
+            Item.objects.create(list=list_, text=f'itemey {i}')
+        with self.assertNumQueries(5):
+            self.post_ajax(list_, {'text': 'itemey 20', 'position': 19})
+
+
+class ListPageCacheTest(TestCase):
+    """тест кэша страницы списка"""
+
+    def test_repeat_view_skips_database(self):
+        """тест: повторный просмотр списка не обращается к БД"""
+
+        list_ = List.create_new('itemey 1')
+        self.client.get(f'/lists/{list_.id}/')
+
+        with self.assertNumQueries(0):
+            response = self.client.get(f'/lists/{list_.id}/')
+
+        self.assertContains(response, '1: itemey 1')
+        self.assertEqual(response.context['list'], list_)
+
+    def test_page_carries_change_log_cursor_for_polling(self):
+        """тест: страница несет курсор журнала изменений для опроса"""
+
+        list_ = List.create_new('itemey 1')
+        last_change = ListChange.objects.filter(list_id=list_.id).last()
+
+        response = self.client.get(f'/lists/{list_.id}/')
+
+        self.assertContains(response, f'data-changes-url="/api/lists/{list_.id}/changes/"')
+        self.assertContains(response, f'data-changes-since="{last_change.id}"')
+
+    def test_new_item_invalidates_cached_page(self):
+        """тест: новый элемент делает кэш страницы недействительным"""
+
+        list_ = List.create_new('itemey 1')
+        self.client.get(f'/lists/{list_.id}/')
+
+        self.client.post(f'/lists/{list_.id}/', data={'text': 'itemey 2'})
+        response = self.client.get(f'/lists/{list_.id}/')
+
+        self.assertContains(response, '2: itemey 2')
+
+    def test_deleted_item_invalidates_cached_page(self):
+        """тест: удаление элемента делает кэш страницы недействительным"""
+
+        list_ = List.create_new('itemey 1')
+        item = Item.objects.create(list=list_, text='itemey 2')
+        self.client.get(f'/lists/{list_.id}/')
+
+        item.delete()
+        response = self.client.get(f'/lists/{list_.id}/')
+
+        self.assertNotContains(response, 'itemey 2')
+
+    def test_sharing_invalidates_cached_page(self):
+        """тест: изменение доступа делает кэш страницы недействительным"""
+
+        friend = User.objects.create(email='friend@mail.com')
+        other_friend = User.objects.create(email='other_friend@mail.com')
+        list_ = List.create_new('itemey 1')
+        self.client.get(f'/lists/{list_.id}/')
+
+        list_.shared_with.add(friend)
+        self.assertContains(self.client.get(f'/lists/{list_.id}/'), 'friend@mail.com')
+
+        other_friend.available_lists.add(list_)
+        self.assertContains(self.client.get(f'/lists/{list_.id}/'), 'other_friend@mail.com')
+
+        other_friend.available_lists.clear()
+        self.assertNotContains(self.client.get(f'/lists/{list_.id}/'), 'other_friend@mail.com')
+
+    def test_cached_page_shows_current_user(self):
+        """тест: закэшированная страница показывает текущего пользователя"""
+
+        list_ = List.create_new('itemey 1')
+        self.client.get(f'/lists/{list_.id}/')
+
+        self.client.force_login(User.objects.create(email='user@mail.com'))
+        response = self.client.get(f'/lists/{list_.id}/')
+
+        self.assertContains(response, 'user@mail.com')
+        self.assertContains(response, 'csrfmiddlewaretoken')
+
+
+class ConditionalGetTest(TestCase):
+    """тест условных GET-запросов"""
+
+    def test_list_page_not_modified_for_matching_etag(self):
+        """тест: страница списка не отдается повторно при совпадении ETag"""
+
+        list_ = List.create_new('itemey 1')
+        etag = self.client.get(f'/lists/{list_.id}/')['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(f'/lists/{list_.id}/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_not_modified_response_marks_list_accessed(self):
+        """тест: ответ 304 тоже отмечает обращение к списку"""
+
+        list_ = List.create_new('itemey 1')
+        etag = self.client.get(f'/lists/{list_.id}/')['ETag']
+        List.objects.filter(id=list_.id).update(last_accessed=timezone.now() - timedelta(days=5))
+        cache.delete(f'list-accessed:{list_.id}')
+
+        self.client.get(f'/lists/{list_.id}/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertGreater(List.objects.get(id=list_.id).last_accessed, timezone.now() - timedelta(days=1))
+
+    def test_list_page_etag_changes_with_new_item(self):
+        """тест: ETag страницы списка меняется при добавлении элемента"""
+
+        list_ = List.create_new('itemey 1')
+        etag = self.client.get(f'/lists/{list_.id}/')['ETag']
+
+        Item.objects.create(list=list_, text='itemey 2')
+        response = self.client.get(f'/lists/{list_.id}/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'itemey 2')
+
+    def test_list_page_etag_depends_on_user(self):
+        """тест: ETag страницы списка зависит от пользователя"""
+
+        list_ = List.create_new('itemey 1')
+        etag = self.client.get(f'/lists/{list_.id}/')['ETag']
+
+        self.client.force_login(User.objects.create(email='user@mail.com'))
+        response = self.client.get(f'/lists/{list_.id}/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_page_etag_changes_with_csrf_cookie(self):
+        """тест: после входа и выхода страница не отдается из кэша со старым CSRF-токеном"""
+
+        list_ = List.create_new('itemey 1')
+        etag = self.client.get(f'/lists/{list_.id}/')['ETag']
+        self.assertEqual(self.client.get(f'/lists/{list_.id}/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.client.force_login(User.objects.create(email='user@mail.com'))
+        self.client.logout()
+        response = self.client.get(f'/lists/{list_.id}/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_my_lists_not_modified_until_list_shared(self):
+        """тест: мои списки не отдаются повторно, пока со мной не поделились списком"""
+
+        owner = User.objects.create(email='user@mail.com')
+        List.create_new('own list', owner=owner)
+        response = self.client.get('/lists/users/user@mail.com/')
+        etag = response['ETag']
+
+        response = self.client.get('/lists/users/user@mail.com/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        List.create_new('shared list').shared_with.add(owner)
+        response = self.client.get('/lists/users/user@mail.com/', HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'shared list')
+
+    def test_my_lists_refreshed_after_list_deleted(self):
+        """тест: после удаления списка мои списки отдаются заново, даже с If-Modified-Since"""
+
+        owner = User.objects.create(email='user@mail.com')
+        List.create_new('first list', owner=owner)
+        second = List.create_new('second list', owner=owner)
+        response = self.client.get('/lists/users/user@mail.com/')
+        self.assertFalse(response.has_header('Last-Modified'))
+
+        second.delete()
+        response = self.client.get(
+            '/lists/users/user@mail.com/',
+            HTTP_IF_NONE_MATCH=response['ETag'],
+            HTTP_IF_MODIFIED_SINCE=http_date(),
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'second list')
+
+
+class ImportItemsViewTest(TestCase):
+    """тест представления массового импорта"""
+
+    def test_unknown_list_is_not_found(self):
+        """тест: импорт в несуществующий список дает 404"""
+
+        self.assertEqual(self.client.get('/lists/100/import').status_code, 404)
+        self.assertEqual(self.client.post('/lists/100/import', data={'text': 'milk'}).status_code, 404)
+
+    def test_uses_import_template(self):
+        """тест: используется шаблон импорта"""
+
+        list_ = List.create_new('itemey 1')
+        response = self.client.get(f'/lists/{list_.id}/import')
+        self.assertTemplateUsed(response, 'import_items.html')
+
+    def test_POST_adds_items_and_shows_report(self):
+        """тест: POST добавляет элементы и показывает отчет"""
+
+        list_ = List.create_new('itemey 1')
+        response = self.client.post(f'/lists/{list_.id}/import', data={'text': 'itemey 1\nitemey 2'})
+
+        self.assertEqual(response.context['report'].created, 1)
+        self.assertContains(response, escape(DUPLICATE_ITEM_ERROR))
+        self.assertEqual(list_.item_set.count(), 2)
+
+    def test_POST_file_in_other_encoding_shows_error(self):
+        """тест: файл не в UTF-8 показывает ошибку, а не падает"""
+
+        list_ = List.create_new('itemey 1')
+        upload = SimpleUploadedFile('items.txt', 'молоко\n'.encode('cp1251'))
+        response = self.client.post(f'/lists/{list_.id}/import', data={'file': upload})
+
+        self.assertContains(response, escape(ENCODING_IMPORT_ERROR.format(line=1)))
+        self.assertEqual(list_.item_set.count(), 1)
+
+    def test_POST_invalidates_cached_list_page(self):
+        """тест: импорт делает кэш страницы списка недействительным"""
+
+        list_ = List.create_new('itemey 1')
+        self.client.get(f'/lists/{list_.id}/')
+
+        self.client.post(f'/lists/{list_.id}/import', data={'text': 'itemey 2'})
+        response = self.client.get(f'/lists/{list_.id}/')
+
+        self.assertContains(response, '2: itemey 2')
+
+
 class NewListViewIntegratedTest(TestCase):
     """тест нового списка"""
 
@@ -200,6 +564,40 @@ class NewListViewIntegratedTest(TestCase):
         """test: может сохранить пост запрос"""
         pass
 
+    def test_repeated_POST_with_same_key_creates_one_list(self):
+        """тест: повторный POST с тем же ключом не создает второй список"""
+
+        first = self.client.post('/lists/new', data={'text': 'new item', 'key': 'abc'})
+        second = self.client.post('/lists/new', data={'text': 'new item', 'key': 'abc'})
+
+        self.assertEqual(List.objects.count(), 1)
+        list_ = List.objects.get()
+        self.assertRedirects(first, f'/lists/{list_.id}/')
+        self.assertRedirects(second, f'/lists/{list_.id}/')
+
+    def test_same_key_with_other_text_is_a_conflict(self):
+        """тест: тот же ключ с другим текстом не ведет молча к старому списку"""
+
+        self.client.post('/lists/new', data={'text': 'new item', 'key': 'abc'})
+        response = self.client.post('/lists/new', data={'text': 'other item', 'key': 'abc'})
+
+        self.assertEqual(response.status_code, 409)
+        self.assertContains(response, escape(KEY_REUSED_ERROR), status_code=409)
+        self.assertEqual(List.objects.count(), 1)
+
+    def test_key_of_other_operation_is_a_conflict(self):
+        """тест: ключ, уже занятый операцией добавления, не ломает создание списка"""
+
+        list_ = List.create_new('milk')
+        self.client.post(
+            '/api/lists/sync', content_type='application/json',
+            data=json.dumps({'operations': [{'key': 'abc', 'type': 'add_item', 'list': list_.id, 'text': 'eggs'}]}),
+        )
+        response = self.client.post('/lists/new', data={'text': 'eggs', 'key': 'abc'})
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(List.objects.count(), 1)
+
     @patch('lists.views.NewListForm')
     def test_list_owner_is_saved_if_user_authenticated(
             self, mockNewListFormClass
@@ -293,10 +691,252 @@ class MyListsTest(TestCase):
         response = self.client.get('/lists/users/correct_user@mail.com/')
         self.assertEqual(response.context['owner'], correct_user)
 
+    def test_number_of_queries_does_not_depend_on_number_of_lists(self):
+        """тест: количество запросов не зависит от количества списков"""
+
+        owner = User.objects.create(email="user@mail.com")
+        List.create_new('first list', owner=owner)
+        self.client.get('/lists/users/user@mail.com/')
+
+        for i in range(5):
+            shared = List.create_new(f'shared list {i}')
+            shared.shared_with.add(owner)
+            List.create_new(f'own list {i}', owner=owner)
+
+        with self.assertNumQueries(4):
+            response = self.client.get('/lists/users/user@mail.com/')
+        self.assertContains(response, 'own list 4')
+        self.assertContains(response, 'shared list 4')
+
+    def test_shows_item_count_for_each_list(self):
+        """тест: для каждого списка отображается количество элементов"""
+
+        owner = User.objects.create(email="user@mail.com")
+        list_ = List.create_new('first item', owner=owner)
+        Item.objects.create(list=list_, text='second item')
+
+        response = self.client.get('/lists/users/user@mail.com/')
+
+        [summary] = response.context['owned_lists'].items
+        self.assertEqual(summary['name'], 'first item')
+        self.assertEqual(summary['item_count'], 2)
+
+    @patch('lists.views.LISTS_PAGE_SIZE', 2)
+    def test_lists_are_paginated_newest_first(self):
+        """тест: списки разбиты на страницы, новые первыми"""
+
+        owner = User.objects.create(email="user@mail.com")
+        lists = [List.create_new(f'list {i}', owner=owner) for i in range(3)]
+
+        response = self.client.get('/lists/users/user@mail.com/')
+        page = response.context['owned_lists']
+        self.assertEqual([row['id'] for row in page.items], [lists[2].id, lists[1].id])
+        self.assertEqual(response.context['owned_next_url'], f'?owned_before={lists[1].id}')
+
+        response = self.client.get(f'/lists/users/user@mail.com/?owned_before={lists[1].id}')
+        page = response.context['owned_lists']
+        self.assertEqual([row['id'] for row in page.items], [lists[0].id])
+        self.assertIsNone(response.context['owned_next_url'])
+
+
+class SearchViewTest(TestCase):
+    """тест страницы поиска"""
+
+    def test_shows_found_items_with_list_links(self):
+        """тест: найденные элементы показываются со ссылками на списки"""
+
+        user = User.objects.create(email='user@mail.com')
+        list_ = List.create_new('buy milk', owner=user)
+        self.client.force_login(user)
+
+        response = self.client.get('/lists/search', data={'q': 'milk'})
+
+        self.assertTemplateUsed(response, 'search.html')
+        self.assertContains(response, f'href="/lists/{list_.id}/"')
+        self.assertContains(response, 'buy milk')
+
+    def test_anonymous_user_is_redirected_home(self):
+        """тест: без входа поиск недоступен"""
+
+        response = self.client.get('/lists/search', data={'q': 'milk'})
+        self.assertRedirects(response, '/')
+
+
+class ExportTest(TestCase):
+    """тест выгрузки списков"""
+
+    def test_export_of_unknown_list_is_not_found(self):
+        """тест: выгрузка несуществующего списка дает 404"""
+
+        self.assertEqual(self.client.get('/lists/100/export.csv').status_code, 404)
+
+    def test_list_exports_items_as_csv_stream(self):
+        """тест: элементы списка выгружаются потоком в CSV"""
+
+        list_ = List.create_new('milk')
+        item = Item.objects.create(list=list_, text='eggs, 10')
+
+        response = self.client.get(f'/lists/{list_.id}/export.csv')
+
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'list_id,list_name,item_id,text')
+        self.assertEqual(lines[2], f'{list_.id},milk,{item.id},"eggs, 10"')
+
+    @patch('lists.export.EXPORT_CHUNK_SIZE', 2)
+    def test_list_exports_items_as_json_in_chunks(self):
+        """тест: элементы выгружаются в JSON, читаясь пачками"""
+
+        list_ = List.create_new('milk')
+        for text in ('eggs', 'bread', 'butter'):
+            Item.objects.create(list=list_, text=text)
+
+        response = self.client.get(f'/lists/{list_.id}/export.json')
+
+        rows = json.loads(b''.join(response.streaming_content).decode())
+        self.assertEqual([row['text'] for row in rows], ['milk', 'eggs', 'bread', 'butter'])
+
+    def test_user_export_contains_owned_and_shared_lists_only(self):
+        """тест: выгрузка пользователя содержит только свои и доступные списки"""
+
+        user = User.objects.create(email='user@mail.com')
+        List.create_new('own', owner=user)
+        List.create_new('shared').shared_with.add(user)
+        List.create_new('other')
+        self.client.force_login(user)
+
+        response = self.client.get('/lists/users/user@mail.com/export.json')
+
+        rows = json.loads(b''.join(response.streaming_content).decode())
+        self.assertEqual([row['text'] for row in rows], ['own', 'shared'])
+
+    def test_user_export_is_forbidden_for_other_users(self):
+        """тест: чужие списки выгрузить нельзя"""
+
+        User.objects.create(email='user@mail.com')
+        response = self.client.get('/lists/users/user@mail.com/export.csv')
+        self.assertEqual(response.status_code, 403)
+
+
+class CloneMergeViewTest(TestCase):
+    """тест копирования и слияния списков"""
+
+    def test_unknown_list_is_not_found(self):
+        """тест: копирование и слияние несуществующего списка дают 404"""
+
+        source = List.create_new('milk')
+        self.assertEqual(self.client.post('/lists/100/clone').status_code, 404)
+        self.assertEqual(self.client.post('/lists/100/merge', data={'source': source.id}).status_code, 404)
+
+    def test_clone_redirects_to_new_list_owned_by_user(self):
+        """тест: копия списка принадлежит вошедшему пользователю"""
+
+        user = User.objects.create(email='user@mail.com')
+        list_ = List.create_new('milk')
+        self.client.force_login(user)
+
+        response = self.client.post(f'/lists/{list_.id}/clone')
+
+        copy = List.objects.exclude(id=list_.id).get()
+        self.assertRedirects(response, f'/lists/{copy.id}/')
+        self.assertEqual(copy.owner, user)
+        self.assertEqual(copy.item_set.get().text, 'milk')
+
+    def test_clone_requires_post(self):
+        """тест: копирование только POST запросом"""
+
+        list_ = List.create_new('milk')
+        response = self.client.get(f'/lists/{list_.id}/clone')
+        self.assertEqual(response.status_code, 405)
+
+    def test_merge_adds_items_from_source(self):
+        """тест: слияние добавляет в список элементы другого списка"""
+
+        source = List.create_new('milk')
+        target = List.create_new('eggs')
+
+        response = self.client.post(f'/lists/{target.id}/merge', data={'source': source.id}, follow=True)
+
+        self.assertRedirects(response, f'/lists/{target.id}/')
+        self.assertContains(response, 'Добавлено элементов: 1')
+        self.assertEqual([item.text for item in target.item_set.all()], ['eggs', 'milk'])
+
+    def test_merge_with_unknown_source_shows_error(self):
+        """тест: слияние с несуществующим списком показывает ошибку"""
+
+        target = List.create_new('eggs')
+        response = self.client.post(f'/lists/{target.id}/merge', data={'source': 'abc'}, follow=True)
+        self.assertContains(response, 'Нет такого списка')
+        self.assertEqual(target.item_set.count(), 1)
+
+
+class DeleteListTest(TestCase):
+    """тест удаления списка"""
+
+    def test_owner_deletes_list_and_is_redirected_to_my_lists(self):
+        """тест: владелец удаляет список и попадает на страницу своих списков"""
+
+        user = User.objects.create(email='user@mail.com')
+        list_ = List.create_new('milk', owner=user)
+        self.client.force_login(user)
+
+        response = self.client.post(f'/lists/{list_.id}/delete')
+
+        self.assertRedirects(response, '/lists/users/user@mail.com/')
+        self.assertFalse(List.objects.exists())
+        self.assertFalse(Item.objects.exists())
+
+    def test_deleted_list_page_is_not_found(self):
+        """тест: страница удаленного списка не находится, даже если была в кэше"""
+
+        user = User.objects.create(email='user@mail.com')
+        list_ = List.create_new('milk', owner=user)
+        self.client.force_login(user)
+        self.client.get(f'/lists/{list_.id}/')
+
+        self.client.post(f'/lists/{list_.id}/delete')
+
+        self.assertEqual(self.client.get(f'/lists/{list_.id}/').status_code, 404)
+
+    def test_other_users_can_not_delete_owned_list(self):
+        """тест: чужой список удалить нельзя"""
+
+        list_ = List.create_new('milk', owner=User.objects.create(email='user@mail.com'))
+        response = self.client.post(f'/lists/{list_.id}/delete')
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(List.objects.exists())
+
+    def test_list_without_owner_can_not_be_deleted(self):
+        """тест: список без владельца через страницу не удаляется никем"""
+
+        list_ = List.create_new('milk')
+        self.client.force_login(User.objects.create(email='user@mail.com'))
+
+        response = self.client.post(f'/lists/{list_.id}/delete')
+
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(List.objects.exists())
+
+    def test_delete_button_is_shown_only_to_owner(self):
+        """тест: кнопка удаления видна только владельцу"""
+
+        user = User.objects.create(email='user@mail.com')
+        list_ = List.create_new('milk', owner=user)
+        self.assertNotContains(self.client.get(f'/lists/{list_.id}/'), f'/lists/{list_.id}/delete')
+
+        self.client.force_login(user)
+        self.assertContains(self.client.get(f'/lists/{list_.id}/'), f'/lists/{list_.id}/delete')
+
 
 class ShareListTest(TestCase):
     """тест расшаривания списков"""
 
+    def test_unknown_list_is_not_found(self):
+        """тест: поделиться несуществующим списком нельзя, ответ 404"""
+
+        response = self.client.post('/lists/100/share', data={'sharee': 'friend@mail.com'})
+        self.assertEqual(response.status_code, 404)
+
     def test_post_redirects_to_list_page(self):
         """test: POST запрос переадресуется на страницу списка"""
 
@@ -314,4 +954,47 @@ class ShareListTest(TestCase):
         print(friend.available_lists.all(), list_.shared_with.all())
 
         
-        
\ No newline at end of file
+        
+    def test_shares_with_many_users_in_one_request(self):
+        """тест: один запрос открывает доступ нескольким пользователям"""
+
+        friends = [User.objects.create(email=f'friend{i}@mail.com') for i in range(3)]
+        list_ = List.create_new('milk')
+
+        self.client.post(f'/lists/{list_.id}/share', data={
+            'sharee': ['friend0@mail.com, friend1@mail.com', 'friend2@mail.com'],
+        })
+
+        self.assertEqual(set(list_.shared_with.all()), set(friends))
+
+    def test_sharing_query_count_does_not_depend_on_recipients(self):
+        """тест: число запросов не зависит от числа получателей"""
+
+        for i in range(6):
+            User.objects.create(email=f'friend{i}@mail.com')
+        one, many = List.create_new('one'), List.create_new('many')
+
+        with CaptureQueriesContext(connection) as one_queries:
+            self.client.post(f'/lists/{one.id}/share', data={'sharee': 'friend0@mail.com'})
+        with CaptureQueriesContext(connection) as many_queries:
+            self.client.post(f'/lists/{many.id}/share', data={
+                'sharee': ' '.join(f'friend{i}@mail.com' for i in range(1, 6)),
+            })
+
+        self.assertEqual(len(many_queries), len(one_queries))
+        self.assertEqual(many.shared_with.count(), 5)
+
+    def test_reports_emails_without_account(self):
+        """тест: адреса без учетной записи перечисляются в предупреждении"""
+
+        User.objects.create(email='friend@mail.com')
+        list_ = List.create_new('milk')
+
+        response = self.client.post(
+            f'/lists/{list_.id}/share',
+            data={'sharee': 'friend@mail.com, nobody@mail.com'},
+            follow=True,
+        )
+
+        self.assertContains(response, 'Нет пользователей с адресами: nobody@mail.com')
+        self.assertEqual(list_.shared_with.get().email, 'friend@mail.com')
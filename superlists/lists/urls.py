@@ -20,7 +20,15 @@ from lists import views
 
 urlpatterns = [
     url(r'^new$', views.new_list, name='new_list'),
+    url(r'^search$', views.search, name='search'),
     url(r'^(.+)/share$', views.share_list, name='share_list'),
     url(r'^users/(.+)/$', views.my_lists, name='my_lists'),
+    url(r'^users/(.+)/export\.(csv|json)$', views.export_user_lists, name='export_user_lists'),
     url(r'^(\d+)/$', views.view_list, name='view_list'),
+    url(r'^(\d+)/clone$', views.clone_list, name='clone_list'),
+    url(r'^(\d+)/merge$', views.merge_list, name='merge_list'),
+    url(r'^(\d+)/delete$', views.delete_list, name='delete_list'),
+    url(r'^(\d+)/import$', views.import_items, name='import_items'),
+    url(r'^(\d+)/events$', views.list_events, name='list_events'),
+    url(r'^(\d+)/export\.(csv|json)$', views.export_list, name='export_list'),
 ]
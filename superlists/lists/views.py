@@ -1,14 +1,38 @@
+import hashlib
+from functools import wraps
+
+from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
-from django.http import HttpResponse
-from django.shortcuts import render, redirect
+from django.db.models import Max
+from django.http import HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.middleware.csrf import get_token
+from django.shortcuts import get_object_or_404, render, redirect
+from django.template.loader import get_template, render_to_string
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.utils.safestring import mark_safe
+from django.views.decorators.http import condition, require_POST
 
 # Create your views here.
-from lists.forms import ItemForm, ExistingListItemForm, NewListForm
-from lists.models import Item, List
+from lists import page_cache
+from lists.events import event_stream
+from lists.export import csv_stream, json_stream
+from lists.forms import ItemForm, ExistingListItemForm, NewListForm, ItemImportForm
+from lists.models import Item, List, ListChange
+from lists.pagination import keyset_chunks, keyset_page, page_url, parse_cursor
+from lists.search import search_items
+from lists.sync import NEW_LIST, apply_operations, sync_scope
+from superlists.throttle import throttle
 
 User = get_user_model()
 
+LISTS_PAGE_SIZE = 50
+ITEMS_PAGE_SIZE = 100
+STREAM_CHUNK_SIZE = 500
+SHARE_MAX_RECIPIENTS = 500
+STREAM_ROWS_MARKER = '<!-- stream rows -->'
+
 
 def home_page(request):
     """домашняя страница"""
@@ -16,44 +40,371 @@ def home_page(request):
     return render(request, 'home.html', {'form': ItemForm()})
 
 
+def _personal_etag(request, key):
+    """ETag страницы с учетом вошедшего пользователя и его CSRF-cookie;
+    без ETag, пока ждут показа сообщения, иначе они не дойдут до браузера
+
+    Вход меняет CSRF-cookie, и закэшированная браузером страница со старым
+    csrfmiddlewaretoken после выхода не должна считаться свежей."""
+
+    if len(messages.get_messages(request)):
+        return None
+    user_email = getattr(request.user, 'email', '')
+    # get_token заводит cookie для первого ответа, и ETag совпадет со следующим запросом
+    get_token(request)
+    return hashlib.md5(f'{key}:{user_email}:{request.META["CSRF_COOKIE"]}'.encode()).hexdigest()
+
+
+def _list_etag(request, list_id):
+    """ETag страницы списка по его версии, без обращения к БД"""
+
+    return _personal_etag(request, f'list:{list_id}:{page_cache.get_version(int(list_id))}')
+
+
+def _marks_access(view):
+    """отмечать обращение к списку, в том числе ответами 304"""
+
+    @wraps(view)
+    def wrapper(request, list_id, *args, **kwargs):
+        List.mark_accessed(int(list_id))
+        return view(request, list_id, *args, **kwargs)
+    return wrapper
+
+
+@_marks_access
+@condition(etag_func=_list_etag)
 def view_list(request, list_id):
     """представление списка"""
-    list_ = List.objects.get(id=list_id)
+    list_id = int(list_id)
+    version = page_cache.get_version(list_id)
+    body = None
+    if request.method == 'GET' and not request.GET:
+        body = page_cache.get_body(list_id, version)
+
+    if body is not None:
+        # тело страницы уже в кэше, сам список из БД не нужен
+        list_ = List(id=list_id)
+    else:
+        list_ = get_object_or_404(List, id=list_id)
+    if request.method == 'GET' and 'after' in request.GET:
+        return _list_items_fragment(request, list_)
+
     form = ExistingListItemForm(for_list=list_)
     if request.method == 'POST':
         form = ExistingListItemForm(for_list=list_, data=request.POST)
-        if form.is_valid():
-            form.save()
+        item = form.is_valid() and form.save()
+        if request.is_ajax():
+            return _added_item_fragment(request, form, item)
+        if item:
             return redirect(list_)
 
-    return render(request, 'list.html', {'list': list_, 'form': form})
+    if request.method == 'GET' and 'all' in request.GET:
+        return _stream_list(request, list_, form)
+
+    if body is None:
+        body = _cached_list_body(list_, version)
+    return render(request, 'list.html', {
+        'list': list_,
+        'form': form,
+        'body': {part: mark_safe(html) for part, html in body.items()},
+    })
+
+
+def _cached_list_body(list_, version):
+    """тело страницы списка из кэша версии, при промахе отрисовать и сохранить"""
+
+    body = page_cache.get_body(list_.id, version)
+    if body is None:
+        body = _render_list_body(list_)
+        page_cache.set_body(list_.id, version, body)
+    return body
+
+
+def _render_list_body(list_, stream_rows_marker=None):
+    """отрисовать общие для всех пользователей части страницы списка"""
 
+    if stream_rows_marker:
+        table_context = {'stream_rows_marker': stream_rows_marker}
+    else:
+        items = _items_page(list_)
+        table_context = {
+            'items': items.items,
+            'start': 0,
+            'next_items_url': _next_items_url(list_, items, 0),
+        }
+    table_context['list_id'] = list_.id
+    table_context['events_url'] = reverse('list_events', args=[list_.id])
+    table_context['changes_url'] = reverse('api_list_changes', args=[list_.id])
+    table_context['changes_since'] = ListChange.objects.filter(list_id=list_.id).aggregate(
+        last=Max('id')
+    )['last'] or 0
+    return {
+        'table': render_to_string('list_table.html', table_context),
+        'sharees': render_to_string('list_sharees.html', {'sharees': list_.shared_with.all()}),
+        # не разметка: по владельцу шаблон решает, показывать ли удаление
+        'owner': list_.owner_id or '',
+    }
 
+
+def _added_item_fragment(request, form, item):
+    """ответ на асинхронное добавление: новая строка таблицы или ошибки формы"""
+
+    if not item:
+        return render(request, 'item_form_errors.html', {'form': form}, status=400)
+    start = parse_cursor(request.POST.get('position')) or 0
+    return render(request, 'list_items.html', {'items': [item], 'start': start}, status=201)
+
+
+def _list_items_fragment(request, list_):
+    """следующая страница элементов списка фрагментом таблицы"""
+
+    start = parse_cursor(request.GET.get('start')) or 0
+    items = _items_page(list_, cursor=parse_cursor(request.GET.get('after')))
+    response = render(request, 'list_items.html', {'items': items.items, 'start': start})
+    next_url = _next_items_url(list_, items, start)
+    if next_url:
+        response['X-Next-Page'] = next_url
+    return response
+
+
+def _stream_list(request, list_, form):
+    """весь список потоком: строки таблицы отдаются частями прямо из курсора БД"""
+
+    page = render_to_string('list.html', {
+        'list': list_,
+        'form': form,
+        'body': _render_list_body(list_, stream_rows_marker=STREAM_ROWS_MARKER),
+    }, request)
+    head, tail = page.split(STREAM_ROWS_MARKER)
+    return StreamingHttpResponse(_stream_list_rows(list_, head, tail))
+
+
+def _stream_list_rows(list_, head, tail):
+    """отрисовать строки таблицы частями по STREAM_CHUNK_SIZE"""
+
+    yield head
+    template = get_template('list_items.html')
+    start = 0
+    for chunk in keyset_chunks(Item.objects.filter(list_id=list_.id).values('id', 'text'), STREAM_CHUNK_SIZE):
+        yield template.render({'items': chunk, 'start': start})
+        start += len(chunk)
+    yield tail
+
+
+def _items_page(list_, cursor=None):
+    """страница элементов списка после курсора"""
+
+    return keyset_page(
+        Item.objects.filter(list_id=list_.id).values('id', 'text'),
+        cursor=cursor,
+        size=ITEMS_PAGE_SIZE,
+    )
+
+
+def _next_items_url(list_, items, start):
+    """адрес следующей страницы элементов"""
+
+    if items.next_cursor is None:
+        return None
+    query = urlencode({'after': items.next_cursor, 'start': start + len(items.items)})
+    return f'{list_.get_absolute_url()}?{query}'
+
+
+def import_items(request, list_id):
+    """массовый импорт элементов в список"""
+
+    list_ = get_object_or_404(List, id=list_id)
+    form = ItemImportForm()
+    report = None
+    if request.method == 'POST':
+        form = ItemImportForm(data=request.POST, files=request.FILES)
+        if form.is_valid():
+            report = form.save(for_list=list_)
+            form = ItemImportForm()
+
+    return render(request, 'import_items.html', {'list': list_, 'form': form, 'report': report})
+
+
+def list_events(request, list_id):
+    """поток новых элементов списка для открытых страниц (server-sent events)"""
+
+    stream = event_stream(int(list_id))
+    if stream is None:
+        # страница перейдет на опрос журнала изменений
+        response = HttpResponse('Слишком много открытых потоков событий', status=503)
+        response['Retry-After'] = '60'
+        return response
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@throttle('new_list')
 def new_list(request):
     """новый список 2"""
 
     form = NewListForm(data=request.POST)
 
     if form.is_valid():
+        key = request.POST.get('key')
+        if key:
+            # повторная отправка той же формы не создает второй список
+            [result] = apply_operations(
+                [{'key': key, 'type': NEW_LIST, 'text': form.cleaned_data['text']}],
+                request.user, sync_scope(request),
+            )
+            if 'list' in result:
+                return redirect('view_list', result['list'])
+            # ключ уже занят другой операцией: форму нужно отправить заново с новым ключом
+            form.add_error('text', result['error'])
+            return render(request, 'home.html', {'form': form}, status=409)
         list_ = form.save(owner=request.user)
         return redirect(list_)
 
     return render(request, 'home.html', {'form': form})
 
 
+def _my_lists_change(request, email):
+    """количество и время последнего изменения списков пользователя, один запрос на запрос"""
+
+    if not hasattr(request, '_my_lists_change'):
+        request._my_lists_change = List.objects.available_to(email).last_change()
+    return request._my_lists_change
+
+
+def _my_lists_etag(request, email):
+    change = _my_lists_change(request, email)
+    return _personal_etag(request, f'my_lists:{email}:{change["count"]}:{change["modified_at"]}')
+
+
+# без Last-Modified: удаление списка не меняет время последнего изменения остальных,
+# а ETag учитывает и количество списков
+@condition(etag_func=_my_lists_etag)
 def my_lists(request, email):
     """мои списки"""
 
     owner = User.objects.get(email=email)
-    return render(request, 'my_lists.html', {'owner': owner})
+    owned_lists = keyset_page(
+        List.objects.filter(owner=owner).summaries(),
+        cursor=parse_cursor(request.GET.get('owned_before')),
+        size=LISTS_PAGE_SIZE,
+        descending=True,
+    )
+    shared_lists = keyset_page(
+        List.objects.filter(shared_with=owner).summaries(),
+        cursor=parse_cursor(request.GET.get('shared_before')),
+        size=LISTS_PAGE_SIZE,
+        descending=True,
+    )
+    return render(request, 'my_lists.html', {
+        'owner': owner,
+        'owned_lists': owned_lists,
+        'owned_next_url': page_url(request, 'owned_before', owned_lists.next_cursor),
+        'shared_lists': shared_lists,
+        'shared_next_url': page_url(request, 'shared_before', shared_lists.next_cursor),
+    })
+
+
+def search(request):
+    """поиск элементов по своим и доступным пользователю спискам"""
+
+    if not request.user.is_authenticated:
+        return redirect('/')
+    query = request.GET.get('q', '').strip()
+    items = search_items(request.user.email, query) if query else []
+    return render(request, 'search.html', {'query': query, 'items': items})
+
+
+EXPORT_FORMATS = {
+    'csv': (csv_stream, 'text/csv; charset=utf-8'),
+    'json': (json_stream, 'application/json'),
+}
+
+
+def export_list(request, list_id, export_format):
+    """выгрузка элементов списка потоком"""
+
+    list_ = get_object_or_404(List, id=list_id)
+    return _export(Item.objects.filter(list_id=list_.id), export_format, f'list-{list_.id}')
+
 
+def export_user_lists(request, email, export_format):
+    """выгрузка элементов всех своих и доступных пользователю списков потоком"""
 
+    if getattr(request.user, 'email', None) != email:
+        return HttpResponseForbidden()
+    items = Item.objects.filter(list__in=List.objects.available_to(email).values('id'))
+    return _export(items, export_format, 'lists')
+
+
+def _export(items, export_format, filename):
+    stream, content_type = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(stream(items), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
+
+
+@require_POST
+def clone_list(request, list_id):
+    """копия списка"""
+
+    list_ = get_object_or_404(List, id=list_id)
+    owner = request.user if request.user.is_authenticated else None
+    return redirect(list_.clone(owner=owner))
+
+
+@require_POST
+def merge_list(request, list_id):
+    """добавить в список элементы другого списка"""
+
+    list_ = get_object_or_404(List, id=list_id)
+    source = List.objects.filter(id=parse_cursor(request.POST.get('source'))).first()
+    if source is None or source.id == list_.id:
+        messages.error(request, 'Нет такого списка')
+    else:
+        count = list_.merge(source)
+        messages.success(request, f'Добавлено элементов: {count}')
+    return redirect(list_)
+
+
+@require_POST
+def delete_list(request, list_id):
+    """удалить список может только владелец; списки без владельца удаляет purge_anonymous_lists"""
+
+    list_ = get_object_or_404(List, id=list_id)
+    if list_.owner_id is None or list_.owner_id != getattr(request.user, 'email', None):
+        return HttpResponseForbidden()
+    list_.delete_fast()
+    return redirect('my_lists', list_.owner_id)
+
+
+def _sharee_emails(request):
+    """адреса получателей: несколько полей sharee, в каждом через запятую или пробел"""
+
+    emails = []
+    for value in request.POST.getlist('sharee'):
+        for email in value.replace(',', ' ').split():
+            if email not in emails:
+                emails.append(email)
+    return emails
+
+
+@throttle('share_list')
 def share_list(request, list_id):
-    """поделиться списком"""
-    email = request.POST.get('sharee')
-    list_ = List.objects.get(id=list_id)
-    user = User.objects.filter(email=email).first()
-    print(email, user, list_)
-    if user:
-        list_.shared_with.add(user)
+    """поделиться списком сразу с несколькими пользователями"""
+
+    list_ = get_object_or_404(List, id=list_id)
+    emails = _sharee_emails(request)
+    if len(emails) > SHARE_MAX_RECIPIENTS:
+        messages.error(request, f'Не больше {SHARE_MAX_RECIPIENTS} адресов за раз')
+        return redirect(list_)
+
+    users = list(User.objects.filter(email__in=emails)) if emails else []
+    if users:
+        list_.shared_with.add(*users)
+    found = {user.email for user in users}
+    missing = [email for email in emails if email not in found]
+    if missing:
+        messages.warning(request, 'Нет пользователей с адресами: ' + ', '.join(missing))
     return redirect(list_)
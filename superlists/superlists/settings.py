@@ -86,6 +86,46 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/1.11/topics/cache/
+# кэши в памяти процесса: сайт работает одним процессом gunicorn (см. deploy_tools),
+# в LocMemCache incr атомарен и сохраняет срок жизни ключа. Команды управления
+# работают в своих процессах и версий списков не меняют: purge_anonymous_lists
+# удаляет списки, к которым давно не обращались, и их тел в кэше уже нет
+CACHES = {
+    # на каждый недавно открытый список приходится до трех записей: версия, тело
+    # страницы и отметка обращения; при переполнении удаляется треть записей
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'default',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+            'CULL_FREQUENCY': 3,
+        },
+    },
+    # после перезапуска корзины ограничения частоты можно начать с полных
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'throttle',
+    },
+}
+
+# ограничение частоты запросов: вид корзины -> (жетонов, за сколько секунд наполняется)
+THROTTLE_RATES = {
+    'send_login_email': {'ip': (30, 60), 'email': (10, 10 * 60)},
+    'new_list': {'ip': (60, 60), 'user': (60, 60)},
+    'share_list': {'ip': (60, 60), 'user': (60, 60)},
+}
+
+# анонимные списки, к которым не обращались дольше, удаляет purge_anonymous_lists
+ANONYMOUS_LIST_RETENTION_DAYS = 90
+
+# токены ссылок входа: 'db' - строка Token на каждую ссылку,
+# 'signed' - подписанный адрес без обращений к БД
+LOGIN_TOKEN_MODE = 'db'
+# в режиме 'signed' не пускать повторно по той же ссылке (отметки в таблице UsedLoginToken)
+LOGIN_TOKEN_SINGLE_USE = True
+
 # Password validation
 # https://docs.djangoproject.com/en/1.11/ref/settings/#auth-password-validators
 
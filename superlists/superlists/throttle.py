@@ -0,0 +1,65 @@
+import hashlib
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+THROTTLE_CACHE = 'throttle'
+TOO_MANY_REQUESTS_MESSAGE = 'Слишком много запросов, попробуйте позже'
+
+
+def client_ip(request):
+    """адрес клиента: gunicorn слушает только сокет nginx, а nginx передает адрес в X-Real-IP"""
+
+    return request.META.get('HTTP_X_REAL_IP') or request.META.get('REMOTE_ADDR')
+
+
+def user_email(request):
+    """email вошедшего пользователя"""
+
+    return request.user.email if request.user.is_authenticated else None
+
+
+def _take_token(cache, key, capacity, period, now):
+    """взять жетон из корзины ключа; возвращает 0 или сколько секунд ждать следующего жетона
+
+    Корзина вмещает capacity жетонов и наполняется заново за period секунд."""
+
+    tokens, updated_at = cache.get(key, (capacity, now))
+    tokens = min(capacity, tokens + (now - updated_at) * capacity / period)
+    if tokens < 1:
+        return math.ceil((1 - tokens) * period / capacity)
+    cache.set(key, (tokens - 1, now), timeout=period)
+    return 0
+
+
+def throttle(scope, email=None):
+    """ограничить частоту запросов к представлению корзинами жетонов из settings.THROTTLE_RATES[scope]
+
+    Корзины ведутся по адресу клиента ('ip'), вошедшему пользователю ('user')
+    и адресу из запроса ('email', его достает функция email). Корзины проверяются
+    по порядку настроек, до первой пустой, так что отказ не стоит запросов к БД."""
+
+    identifiers = {'ip': client_ip, 'user': user_email, 'email': email}
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            cache = caches[THROTTLE_CACHE]
+            now = time.time()
+            for kind, (capacity, period) in settings.THROTTLE_RATES.get(scope, {}).items():
+                ident = identifiers[kind] and identifiers[kind](request)
+                if not ident:
+                    continue
+                key = f'throttle:{scope}:{kind}:' + hashlib.md5(str(ident).encode()).hexdigest()
+                retry_after = _take_token(cache, key, capacity, period, now)
+                if retry_after:
+                    response = HttpResponse(TOO_MANY_REQUESTS_MESSAGE, status=429)
+                    response['Retry-After'] = str(retry_after)
+                    return response
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -17,12 +17,14 @@ from django.conf.urls import url, include
 from django.contrib import admin
 
 from lists import urls as lists_urls
+from lists import api_urls as lists_api_urls
 from lists import views as lists_views
 from accounts import urls as accounts_urls
 
 urlpatterns = [
     url(r'^admin/', admin.site.urls),
     url(r'^lists/', include(lists_urls)),
+    url(r'^api/lists/', include(lists_api_urls)),
     url(r'^accounts/', include(accounts_urls)),
     url(r'^$', lists_views.home_page, name='home'),
 ]